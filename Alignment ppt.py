@@ -2,48 +2,47 @@ import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter.scrolledtext import ScrolledText
-from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
-from pptx.util import Pt
 from tkinter import ttk
 from tkinter.font import Font
+from log_sink import LogSink
+from tk_log_view import TkLogView
+from slide_transforms import FAILED
+from ppt_batch import BLACK, DeckJob, align_deck
+
+# Milliseconds between checks for finished decks
+POLL_INTERVAL = 100
+
+# Media optimization choices; Off leaves images as they are
+MEDIA_DPI_VALUES = ['Off', 96, 150, 220, 300]
+
+# Decks are processed on worker processes; the Tk loop only polls for their outcomes
+def start_alignment(file_paths, weight, black_border=False, media_dpi='Off'):
+    media_dpi = None if media_dpi == 'Off' else int(media_dpi)
+    # With a black border both tools' changes are made in the same load and save of each deck
+    job = DeckJob(align_deck, file_paths, (weight, BLACK if black_border else None, media_dpi))
+    if not job.paths:
+        messagebox.showwarning("Warning", "No PowerPoint files selected.")
+        return
+    execute_button.config(state=tk.DISABLED)
+    log_sink.log(f"Processing {len(job.paths)} presentations on {min(job.workers, len(job.paths))} processes...")
+    job.start()
+    root.after(POLL_INTERVAL, poll_deck_job, job)
+
+def poll_deck_job(job):
+    for pptx_path, status, message in job.drain():
+        log_sink.log(message, level="error" if status == FAILED else "info", path=pptx_path, status=status)
+    if not job.finished.is_set():
+        root.after(POLL_INTERVAL, poll_deck_job, job)
+        return
+
+    execute_button.config(state=tk.NORMAL)
+    log_sink.log(job.summary())
+    log_view.flush()
+    if job.failures:
+        messagebox.showwarning("Processing Complete", f"{job.summary()}, see the log.")
+    else:
+        messagebox.showinfo("Processing Complete", f"All PowerPoint files processed successfully!\n{job.summary()}")
 
-# Function to process PowerPoint files
-def align_and_adjust_pictures(file_paths, weight, log_text):
-    for pptx_path in file_paths:
-        log_text.insert(tk.END, f"Processing {pptx_path}...\n")
-        log_text.update()
-
-        try:
-            prs = Presentation(pptx_path)
-        except Exception as e:
-            log_text.insert(tk.END, f"Error opening the presentation {pptx_path}: {e}\n")
-            log_text.update()
-            continue
-
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                    left = int((prs.slide_width - shape.width) / 2)
-                    top = int((prs.slide_height - shape.height) / 2)
-                    shape.left = left
-                    shape.top = top
-
-                    picture_format = shape.line
-                    if picture_format is not None:
-                        picture_format.width = Pt(float(weight))
-                    else:
-                        picture_format = shape.line.format
-                        picture_format.width = Pt(float(weight))
-
-        try:
-            prs.save(pptx_path)
-            log_text.insert(tk.END, f"Pictures aligned to center and border weights adjusted successfully for {pptx_path}\n")
-            log_text.update()
-        except Exception as e:
-            log_text.insert(tk.END, f"Error saving the presentation {pptx_path}: {e}\n")
-            log_text.update()
-    messagebox.showinfo("Processing Complete", "All PowerPoint files processed successfully!")
 # Function to browse files and trigger processing
 def browse_files(file_entry, weight_combo, log_text):
     file_paths = filedialog.askopenfilenames(filetypes=[("PowerPoint files", "*.pptx")])
@@ -51,43 +50,62 @@ def browse_files(file_entry, weight_combo, log_text):
         file_entry.delete(0, tk.END)
         file_entry.insert(tk.END, "\n".join(file_paths))
 
-# Create Tkinter window
-root = tk.Tk()
-root.title("PowerPoint Picture Alignment Tool")
-root.geometry("700x400")
-root.configure(bg='#e1d0ba')  # Set background color
-
-# Bold font
-bold_font = Font(family="Helvetica", size=12, weight="bold")
-
-# File entry label and widget
-file_label = tk.Label(root, bg='#e1d0ba', text="Select PowerPoint file(s):", font=('Helvetica Bold', 12))
-file_label.grid(row=0, column=0, sticky="w", padx=10, pady=10)  # Align to the west (left)
-file_entry = tk.Entry(root,bg='#EEEEEE', width=60)
-file_entry.grid(row=0, column=1, padx=10, sticky="we")  # Align to the west and east (left and right)
-
-# Browse button for files
-browse_button = tk.Button(root, bg='#e1d0ba', text="Browse", font=('Helvetica Bold', 12), command=lambda: browse_files(file_entry, weight_combo, log_text))
-browse_button.grid(row=0, column=2, padx=10)  # Set position and size
-
-# Weight selection label and widget
-weight_values = [0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5, 5.5, 6, 6.5, 7, 7.5, 8, 8.5, 9, 9.5, 10]
-# weight_label = tk.Label(root, bg='#e1d0ba', text="Weight:", font=('Helvetica Bold', 12))
-# weight_label.grid(row=1, column=1, sticky="ne")  # Align to the west (left)
-weight_combo = ttk.Combobox(root, values=weight_values, width=10, state="readonly")
-weight_combo.current(0)  # Set default selection
-weight_combo.grid(row=1, column=2,sticky="ns", pady=10)  # Align to the west and east (left and right)
-
-# Log display label and widget
-log_label = tk.Label(root, bg='#e1d0ba', text="Log:", font=('Helvetica Bold', 12))
-log_label.grid(row=1, column=0, sticky="w",padx=10)  # Align to the west (left)
-log_text = ScrolledText(root,bg='#EEEEEE', height=12, width=80)
-log_text.grid(row=2, column=0, columnspan=3, padx=10 ,sticky="wns")  # Span across three columns
-
-# Execute button
-execute_button = tk.Button(root, bg='#e1d0ba', text="Execute", font=('Helvetica Bold', 12),command=lambda: align_and_adjust_pictures(file_entry.get().split("\n"), weight_combo.get(), log_text))
-execute_button.grid(row=4, column=0, columnspan=3, padx=10, pady=20, sticky="we")  # Span across three columns
-
-# Start GUI event loop
-root.mainloop()
+# Worker processes re-import this script, so only build the GUI when run directly
+if __name__ == '__main__':
+    # Create Tkinter window
+    root = tk.Tk()
+    root.title("PowerPoint Picture Alignment Tool")
+    root.geometry("700x400")
+    root.configure(bg='#e1d0ba')  # Set background color
+
+    # Bold font
+    bold_font = Font(family="Helvetica", size=12, weight="bold")
+
+    # File entry label and widget
+    file_label = tk.Label(root, bg='#e1d0ba', text="Select PowerPoint file(s):", font=('Helvetica Bold', 12))
+    file_label.grid(row=0, column=0, sticky="w", padx=10, pady=10)  # Align to the west (left)
+    file_entry = tk.Entry(root,bg='#EEEEEE', width=60)
+    file_entry.grid(row=0, column=1, padx=10, sticky="we")  # Align to the west and east (left and right)
+
+    # Browse button for files
+    browse_button = tk.Button(root, bg='#e1d0ba', text="Browse", font=('Helvetica Bold', 12), command=lambda: browse_files(file_entry, weight_combo, log_text))
+    browse_button.grid(row=0, column=2, padx=10)  # Set position and size
+
+    # Weight selection label and widget
+    weight_values = [0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5, 5.5, 6, 6.5, 7, 7.5, 8, 8.5, 9, 9.5, 10]
+    # weight_label = tk.Label(root, bg='#e1d0ba', text="Weight:", font=('Helvetica Bold', 12))
+    # weight_label.grid(row=1, column=1, sticky="ne")  # Align to the west (left)
+    weight_combo = ttk.Combobox(root, values=weight_values, width=10, state="readonly")
+    weight_combo.current(0)  # Set default selection
+    weight_combo.grid(row=1, column=2,sticky="ns", pady=10)  # Align to the west and east (left and right)
+
+    # Also make the borders solid black, as the W8 Adjustment Tool does
+    black_border_var = tk.BooleanVar()
+    black_border_check = tk.Checkbutton(root, bg='#e1d0ba', text="Black Border", variable=black_border_var, font=('Helvetica Bold', 12))
+    black_border_check.grid(row=1, column=1, sticky="e")
+
+    # Log display label and widget
+    log_label = tk.Label(root, bg='#e1d0ba', text="Log:", font=('Helvetica Bold', 12))
+    log_label.grid(row=1, column=0, sticky="w",padx=10)  # Align to the west (left)
+    log_text = ScrolledText(root,bg='#EEEEEE', height=12, width=80)
+    log_text.grid(row=2, column=0, columnspan=3, padx=10 ,sticky="wns")  # Span across three columns
+    # Log lines are batched into the widget and kept in full in a JSON-lines file
+    log_sink = LogSink('Alignment ppt')
+    log_view = TkLogView(log_text, log_sink)
+    log_view.start()
+
+    # Merge duplicate images and shrink oversized ones to this many pixels per inch of their on-slide size
+    media_label = tk.Label(root, bg='#e1d0ba', text="Media DPI:", font=('Helvetica Bold', 12))
+    media_label.grid(row=3, column=0, sticky="w", padx=10)
+    media_combo = ttk.Combobox(root, values=MEDIA_DPI_VALUES, width=5, state="readonly")
+    media_combo.current(0)  # Off by default
+    media_combo.grid(row=3, column=1, sticky="w", pady=10)
+
+    # Execute button
+    execute_button = tk.Button(root, bg='#e1d0ba', text="Execute", font=('Helvetica Bold', 12),command=lambda: start_alignment(file_entry.get().split("\n"), weight_combo.get(), black_border_var.get(), media_combo.get()))
+    execute_button.grid(row=4, column=0, columnspan=3, padx=10, pady=20, sticky="we")  # Span across three columns
+
+    # Start GUI event loop
+    root.mainloop()
+    log_sink.close()
 
@@ -1,13 +1,18 @@
 import os
 import shutil
 import sys
-import itertools
-import re
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QLineEdit, QPushButton, 
                              QMessageBox, QTextEdit, QFileDialog, QCheckBox, QComboBox, QListWidget,
-                             QVBoxLayout, QHBoxLayout)
+                             QVBoxLayout, QHBoxLayout, QProgressBar)
 from PyQt5.QtGui import QFont
-from pandas import read_csv
+from job_runner import JobRunner
+from log_sink import LogSink
+from qt_log_view import QtLogView
+from gladiator_ops import (copy_folder, copy_folders, merge_folder, move_files_to_folders, rename_files_in_folder,
+                           resume_distribution, rollback_distribution)
+from folder_plan import journal_path
+from sync_manifest import SyncManifest
+from dir_index import get_index
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -62,6 +67,22 @@ class MainWindow(QWidget):
         self.file_type_csv.stateChanged.connect(self.handleFileTypeChange)
         self.file_type_excel.stateChanged.connect(self.handleFileTypeChange)
 
+        # Only copy folders whose source CSV changed since the last copy
+        self.sync_mode = QCheckBox('Sync Mode', self)
+        self.sync_mode.setGeometry(860, 280, 180, 30)
+        self.sync_mode.setFont(QFont('Helvetica Bold', 12))
+        self.sync_manifest = None
+
+        # Chunks queued between the read, clean and write stages of Copy. Off, the default, runs one
+        # task per folder, so several folders are cleaned at once
+        queue_depth_label = QLabel('Queue:', self)
+        queue_depth_label.setGeometry(1050, 240, 70, 30)
+        queue_depth_label.setFont(QFont('Helvetica Bold', 12))
+        self.queue_depth = QComboBox(self)
+        self.queue_depth.setGeometry(1120, 240, 70, 30)
+        self.queue_depth.addItems(['Off', '2', '4', '8', '16'])
+        self.queue_depth.setCurrentText('Off')
+
         # Number of Files
         num_files_label = QLabel('Number of Files:', self)
         num_files_label.setGeometry(650, 180, 150, 30)
@@ -144,17 +165,38 @@ class MainWindow(QWidget):
         self.desired_value_var.setGeometry(150, 280, 200, 30)
 
         # Buttons
-        copy_button = QPushButton('Copy CSV', self)
-        copy_button.setGeometry(10, 730, 100, 30)
-        copy_button.clicked.connect(self.copyAndRenameCSVFiles)
-
-        create_button = QPushButton('Create Folders', self)
-        create_button.setGeometry(540, 730, 150, 30)
-        create_button.clicked.connect(self.createAndRenameFolders)
-
-        rename_button = QPushButton('Rename CSV', self)
-        rename_button.setGeometry(1040, 730, 100, 30)
-        rename_button.clicked.connect(self.renameCSVFilesInFolders)
+        self.copy_button = QPushButton('Copy CSV', self)
+        self.copy_button.setGeometry(10, 730, 100, 30)
+        self.copy_button.clicked.connect(self.copyAndRenameCSVFiles)
+
+        self.create_button = QPushButton('Create Folders', self)
+        self.create_button.setGeometry(540, 730, 150, 30)
+        self.create_button.clicked.connect(self.createAndRenameFolders)
+
+        self.rename_button = QPushButton('Rename CSV', self)
+        self.rename_button.setGeometry(1040, 730, 100, 30)
+        self.rename_button.clicked.connect(self.renameCSVFilesInFolders)
+
+        self.merge_button = QPushButton('Merge CSV', self)
+        self.merge_button.setGeometry(860, 730, 120, 30)
+        self.merge_button.clicked.connect(self.mergeCSVFiles)
+
+        self.cancel_button = QPushButton('Cancel', self)
+        self.cancel_button.setGeometry(720, 730, 100, 30)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancelJob)
+
+        # Progress of the running operation
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setGeometry(130, 735, 390, 20)
+
+        # Operations run on a thread pool so the window stays responsive
+        # Log lines are batched into the widget and kept in full in a JSON-lines file
+        self.log = LogSink('CSV_Gldiator')
+        self.log_view = QtLogView(self.log_text, self.log, parent=self)
+        self.jobs = JobRunner(log_sink=self.log, parent=self)
+        self.jobs.progress.connect(self.updateProgress)
+        self.jobs.finished.connect(self.jobFinished)
 
         # Populate columns in combobox
         columns = ['Longitude', 'Latitude', 'RSSI (0)', 'R0 RSRP (0)', 'R0 RS CINR (0)', 'Cell ID (0)']
@@ -192,18 +234,18 @@ class MainWindow(QWidget):
                 self.original_names_text.insertPlainText(original_name)
                 self.new_names_text.insertPlainText(new_name)
         except ValueError:
-            self.log_text.append("Please enter a valid number of files.")
+            self.log("Please enter a valid number of files.")
 
     def copyAndRenameCSVFiles(self):
         source_root_folder = self.source_var.text()
         destination_folder = self.destination_var.text()
 
         if not os.path.exists(source_root_folder):
-            self.log_text.append(f"Source root folder '{source_root_folder}' does not exist.")
+            self.log(f"Source root folder '{source_root_folder}' does not exist.")
             return
 
         if not os.path.exists(destination_folder):
-            self.log_text.append(f"Destination folder '{destination_folder}' does not exist.")
+            self.log(f"Destination folder '{destination_folder}' does not exist.")
             return
 
         file_extension = '.csv' if self.file_type_csv.isChecked() else '.xlsx'
@@ -211,101 +253,142 @@ class MainWindow(QWidget):
         try:
             columns_to_clean = self.getColumnsToClean()
             desired_value = self.desired_value_var.text()
-
-            for folder_name in os.listdir(source_root_folder):
-                folder_path = os.path.join(source_root_folder, folder_name)
-                if os.path.isdir(folder_path):
-                    csv_files = [f for f in os.listdir(folder_path) if f.endswith('.csv')]
-                    if len(csv_files) == 1:
-                        csv_file_path = os.path.join(folder_path, csv_files[0])
-                        new_file_name = f"{folder_name}_data{file_extension}"
-                        destination_file_path = os.path.join(destination_folder, new_file_name)
-                        
-                        df = read_csv(csv_file_path)
-                        for column in columns_to_clean:
-                            if desired_value == "missing":
-                                df = df.dropna(subset=[column])
-                            else:
-                                df[column] = df[column].replace(desired_value, float('nan'))
-                        df.to_csv(destination_file_path, index=False)
-                        
-                        self.log_text.append(f"File '{csv_file_path}' copied and cleaned values for selected columns, then saved as '{new_file_name}'.")
+            manifest = SyncManifest(destination_folder) if self.sync_mode.isChecked() else None
+
+            folders = [(os.path.join(source_root_folder, folder_name), folder_name)
+                       for folder_name in get_index(source_root_folder).dirs()]
+            depth = self.queue_depth.currentText()
+            if depth == 'Off':
+                # One task per source folder, so several folders are cleaned at once
+                tasks = [(copy_folder, (folder_path, folder_name, destination_folder, file_extension,
+                                        columns_to_clean, desired_value, manifest))
+                         for folder_path, folder_name in folders]
+            else:
+                # One pipeline that reads ahead while earlier files are cleaned and written
+                tasks = [(copy_folders, (folders, destination_folder, file_extension, columns_to_clean,
+                                         desired_value, manifest, int(depth)))]
+            if not self.jobs.isRunning():
+                self.sync_manifest = manifest
+            self.startJob(tasks)
         except Exception as e:
-            self.log_text.append(f"An error occurred while copying and cleaning CSV files: {e}")
+            self.log(f"An error occurred while copying and cleaning CSV files: {e}")
 
     def createAndRenameFolders(self):
         source_dir = self.source_directory_var.text()
 
         if not os.path.exists(source_dir):
-            self.log_text.append(f"Source directory '{source_dir}' does not exist.")
+            self.log(f"Source directory '{source_dir}' does not exist.")
             return
 
         try:
-            csv_files = [file for file in os.listdir(source_dir) if file.endswith(".csv")]
-            csv_files.sort(key=self.extract_number)
-
-            total_files = len(csv_files)
             folder_names = self.folder_names_var.text().split(",")
-            num_folders = len(folder_names)
-            folder_count = 0
-            file_index = 0
-
-            while file_index < total_files:
-                folder_name = folder_names[folder_count].strip()
-                folder_path = os.path.join(source_dir, folder_name)
-                if not os.path.exists(folder_path):
-                    os.mkdir(folder_path)
-
-                for _ in range(int(self.num_files_per_folder_var.text())):
-                    if file_index < total_files:
-                        old_file_path = os.path.join(source_dir, csv_files[file_index])
-                        new_file_path = os.path.join(folder_path, csv_files[file_index])
-                        os.rename(old_file_path, new_file_path)
-                        file_index += 1
-
-                self.log_text.append(f"Moved {int(self.num_files_per_folder_var.text())} CSV files to folder '{folder_name}'")
-                folder_count = (folder_count + 1) % num_folders
-
-            self.log_text.append("CSV files moved to folders successfully!")
-
+            if os.path.exists(journal_path(source_dir)):
+                # A previous distribution was interrupted: finish it or undo it before planning a new one
+                answer = QMessageBox.question(
+                    self, "Unfinished Distribution",
+                    "A previous Create Folders run was interrupted. Resume it?\n"
+                    "Choose No to move its files back instead.",
+                    QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel)
+                if answer == QMessageBox.Yes:
+                    self.startJob([(resume_distribution, (source_dir,))])
+                elif answer == QMessageBox.No:
+                    self.startJob([(rollback_distribution, (source_dir,))])
+                return
+            num_files_per_folder = int(self.num_files_per_folder_var.text())
+            self.startJob([(move_files_to_folders, (source_dir, folder_names, num_files_per_folder))])
         except Exception as e:
-            self.log_text.append(f"An error occurred: {e}")
-
-    def extract_number(self, filename):
-        match = re.search(r'\d+', filename)
-        return int(match.group()) if match else 0
+            self.log(f"An error occurred: {e}")
 
     def renameCSVFilesInFolders(self):
         source_directory = self.source_directory_var.text()
 
         if not os.path.exists(source_directory):
-            self.log_text.append(f"Source directory '{source_directory}' does not exist.")
+            self.log(f"Source directory '{source_directory}' does not exist.")
             return
 
         file_extension = '.csv' if self.file_type_csv.isChecked() else '.xlsx'
         desired_names = self.new_names_text.toPlainText().splitlines()
 
+        tasks = []
         for folder_name in self.folder_names_var.text().split(","):
             folder_name = folder_name.strip()
             source_folder = os.path.join(source_directory, folder_name)
 
             if not os.path.exists(source_folder):
-                self.log_text.append(f"Folder '{source_folder}' does not exist.")
+                self.log(f"Folder '{source_folder}' does not exist.")
                 continue
 
-            desired_names_cycle = itertools.cycle(desired_names)
-
-            for file_name in os.listdir(source_folder):
-                if file_name.endswith('.csv'):
-                    desired_name = next(desired_names_cycle)
-                    new_file_name = f"{folder_name}_{desired_name}{file_extension}"  # Prepend the folder name to the desired name
-                    old_file_path = os.path.join(source_folder, file_name)
-                    new_file_path = os.path.join(source_folder, new_file_name)
-                    try:
-                        os.rename(old_file_path, new_file_path)
-                        self.log_text.append(f"File '{file_name}' renamed to '{new_file_name}'.")
-                    except Exception as e:
-                        self.log_text.append(f"Failed to rename '{file_name}' to '{new_file_name}': {e}")
+            tasks.append((rename_files_in_folder, (source_folder, folder_name, desired_names, file_extension)))
+        self.startJob(tasks)
+
+    def mergeCSVFiles(self):
+        source_directory = self.source_directory_var.text()
+        destination_folder = self.destination_var.text()
+
+        if not os.path.exists(source_directory):
+            self.log(f"Source directory '{source_directory}' does not exist.")
+            return
+
+        if not os.path.exists(destination_folder):
+            self.log(f"Destination folder '{destination_folder}' does not exist.")
+            return
+
+        file_extension = '.csv' if self.file_type_csv.isChecked() else '.xlsx'
+        columns_to_clean = self.getColumnsToClean()
+        desired_value = self.desired_value_var.text()
+
+        # Merge each folder made by Create Folders, or the source directory itself when none are named
+        folder_names = [name.strip() for name in self.folder_names_var.text().split(",") if name.strip()]
+        if not folder_names:
+            folder_names = ['']
+
+        tasks = []
+        for folder_name in folder_names:
+            folder_path = os.path.join(source_directory, folder_name) if folder_name else source_directory
+            if not os.path.isdir(folder_path):
+                self.log(f"Folder '{folder_path}' does not exist.")
+                continue
+            merged_name = f"{folder_name or os.path.basename(os.path.normpath(source_directory))}_merged{file_extension}"
+            tasks.append((merge_folder, (folder_path, os.path.join(destination_folder, merged_name),
+                                         columns_to_clean, desired_value)))
+        self.startJob(tasks)
+
+    def startJob(self, tasks):
+        if self.jobs.isRunning():
+            self.log("Another operation is still running.")
+            return
+        for button in (self.copy_button, self.create_button, self.rename_button, self.merge_button):
+            button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.jobs.start(tasks)
+
+    def cancelJob(self):
+        self.cancel_button.setEnabled(False)
+        self.jobs.cancel()
+
+    def updateProgress(self, done, total):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+
+    def jobFinished(self, cancelled):
+        for button in (self.copy_button, self.create_button, self.rename_button, self.merge_button):
+            button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        if self.sync_manifest is not None:
+            try:
+                self.sync_manifest.save()
+            except OSError as e:
+                self.log(f"Could not save the sync manifest: {e}")
+            self.sync_manifest = None
+        if cancelled:
+            self.log("Operation cancelled.")
+
+    def closeEvent(self, event):
+        # Tasks log into the sink until they return, so stop them before closing it
+        self.jobs.shutdown()
+        self.log_view.flush()
+        self.log.close()
+        super().closeEvent(event)
 
     def addSelectedColumn(self):
         column = self.column_selection_var.currentText()
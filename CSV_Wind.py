@@ -1,29 +1,36 @@
 import os
-import shutil
 import tkinter as tk
-from tkinter import filedialog, messagebox, Listbox, Scrollbar, Text, Checkbutton
+from tkinter import filedialog, messagebox, Scrollbar, Text, Checkbutton, ttk
+from copy_engine import CopyJob
+from sync_manifest import SyncManifest
+from dir_index import get_index
+from virtual_list import VirtualListbox
+from log_sink import LogSink
+
+# Milliseconds between progress updates while files are being copied
+POLL_INTERVAL = 100
 
 def get_files(source_folder, file_types):
-    files = []
-    for file in os.listdir(source_folder):
-        if file.endswith('.csv') and 'csv' in file_types:
-            files.append(file)
-        elif file.endswith('.xlsx') and 'excel' in file_types:
-            files.append(file)
-    return files
+    extensions = []
+    if 'csv' in file_types:
+        extensions.append('.csv')
+    if 'excel' in file_types:
+        extensions.append('.xlsx')
+    if not extensions:
+        return []
+    return get_index(source_folder).files(extensions)
 
 def browse_source_folder():
     source_folder = filedialog.askdirectory()
     source_path_entry.delete(0, tk.END)
     source_path_entry.insert(tk.END, source_folder)
-    files = get_files(source_folder, [])
+    if not source_folder:
+        return
     if csv_var.get():
-        files += get_files(source_folder, ['csv'])
+        files = get_files(source_folder, ['csv'])
     else:
-        files += get_files(source_folder, ['excel'])
-    files_listbox.delete(0, tk.END)
-    for file in files:
-        files_listbox.insert(tk.END, file)
+        files = get_files(source_folder, ['excel'])
+    files_listbox.set_items(files)
 
 def browse_target_folder():
     target_folder = filedialog.askdirectory()
@@ -50,15 +57,58 @@ def submit_form():
         messagebox.showerror("Error", "Number of new filenames does not match number of selected files.")
         return
 
-    try:
-        for index, selected_index in enumerate(selected_indices):
-            filename = files_listbox.get(selected_index)
-            source_file_path = os.path.join(source_folder, filename)
-            target_file_path = os.path.join(target_folder, new_filenames[index])
-            shutil.copy2(source_file_path, target_file_path)
+    pairs = []
+    for index, selected_index in enumerate(selected_indices):
+        filename = files_listbox.get(selected_index)
+        source_file_path = os.path.join(source_folder, filename)
+        target_file_path = os.path.join(target_folder, new_filenames[index])
+        pairs.append((source_file_path, target_file_path))
+
+    # In sync mode only files whose source changed since the last run are copied
+    manifest = None
+    skipped = 0
+    if sync_var.get():
+        manifest = SyncManifest(target_folder, content_hash=checksum_var.get())
+        pending = [pair for pair in pairs if not manifest.is_current(*pair)]
+        skipped = len(pairs) - len(pending)
+        pairs = pending
+
+    # Copy on a background thread pool and poll its progress from the Tk loop
+    job = CopyJob(pairs, checksum=checksum_var.get(), on_copied=manifest.record if manifest is not None else None)
+    submit_button.config(state=tk.DISABLED)
+    progress_bar.config(maximum=max(job.total_bytes, 1), value=0)
+    job.start()
+    root.after(POLL_INTERVAL, poll_copy_job, job, manifest, skipped)
+
+def poll_copy_job(job, manifest=None, skipped=0):
+    progress_bar.config(value=job.copied_bytes)
+    progress_label.config(text=f"Copied {job.done_files} of {len(job.pairs)} files "
+                               f"({job.copied_bytes / 1048576:.1f} of {job.total_bytes / 1048576:.1f} MB)")
+    if not job.finished.is_set():
+        root.after(POLL_INTERVAL, poll_copy_job, job, manifest, skipped)
+        return
+
+    submit_button.config(state=tk.NORMAL)
+    for source, target, error in job.failures:
+        log_sink.log(f"Could not copy '{source}' to '{target}': {error}", level='error', source=source, target=target)
+    log_sink.log(f"Copied {job.done_files - len(job.failures)} of {len(job.pairs)} files, {skipped} already up to date.")
+    if manifest is not None:
+        try:
+            manifest.save()
+        except OSError as e:
+            messagebox.showwarning("Warning", f"Could not save the sync manifest: {e}")
+    if job.failures:
+        lines = [f"{os.path.basename(source)}: {error}" for source, target, error in job.failures]
+        if len(lines) > 20:
+            lines = lines[:20] + [f"... and {len(lines) - 20} more"]
+        messagebox.showerror("Error", f"{len(job.failures)} of {len(job.pairs)} files could not be copied:\n" + "\n".join(lines))
+    elif skipped:
+        messagebox.showinfo("Success", f"{len(job.pairs)} files copied, {skipped} already up to date.")
+    else:
         messagebox.showinfo("Success", "Files copied successfully.")
-    except Exception as e:
-        messagebox.showerror("Error", f"Error copying files: {e}")
+
+# Copy outcomes go to a JSON-lines log
+log_sink = LogSink('CSV_Wind')
 
 # Create main window
 root = tk.Tk()
@@ -105,7 +155,7 @@ excel_checkbox.grid(row=5, column=2, sticky="ne")
 # Files Listbox
 files_label = tk.Label(root,bg="#e1d0ba", text="Files:", font=('Helvetica Bold', 12))
 files_label.grid(row=5, column=0, sticky="w")
-files_listbox = Listbox(root,bg="#e1d0ba", width=150, height=30, selectmode=tk.MULTIPLE)
+files_listbox = VirtualListbox(root,bg="#e1d0ba", width=150, height=30, selectmode=tk.MULTIPLE)
 files_listbox.grid(row=5, column=1, padx=1, pady=5, columnspan=1)
 scrollbar = Scrollbar(root,bg="#e1d0ba", orient="vertical", command=files_listbox.yview)
 scrollbar.grid(row=5, column=2, padx=0, sticky="ns")
@@ -121,4 +171,21 @@ rename_entry.grid(row=6, column=1, padx=5, pady=5)
 submit_button = tk.Button(root, text="Execute Files",bg="#e1d0ba",width=20, height=2, command=submit_form, font=('Helvetica Bold', 12))
 submit_button.grid(row=7, column=1,columnspan=1, pady=10)
 
+# Verify copies by checksum instead of size only
+checksum_var = tk.BooleanVar()
+checksum_checkbox = Checkbutton(root,bg="#e1d0ba", text="Verify Checksum", variable=checksum_var, font=('Helvetica Bold', 12))
+checksum_checkbox.grid(row=7, column=2, sticky="w")
+
+# Skip files that are unchanged since they were last copied to the target
+sync_var = tk.BooleanVar()
+sync_checkbox = Checkbutton(root,bg="#e1d0ba", text="Sync Mode", variable=sync_var, font=('Helvetica Bold', 12))
+sync_checkbox.grid(row=8, column=2, sticky="w")
+
+# Copy Progress
+progress_bar = ttk.Progressbar(root, orient="horizontal", length=600, mode="determinate")
+progress_bar.grid(row=8, column=1, pady=5)
+progress_label = tk.Label(root,bg="#e1d0ba", text="", font=('Helvetica Bold', 10))
+progress_label.grid(row=9, column=1, pady=5)
+
 root.mainloop()
+log_sink.close()
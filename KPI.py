@@ -1,7 +1,12 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import os
-import pandas as pd
+from kpi_engine import (GRID_OUTPUT, analyze_file, analyze_directory, sweep_directory, histogram_result,
+                        sweep_table, cdf_table, is_data_csv)
+from kpi_cache import KPICache, clear_cache
+from report_writer import ReportWriter, encode_settings, partial_settings, write_workbook
+from geo_grid import GRID_SIZES, grid_directory, export_csv, export_geojson
+from log_sink import LogSink
 
 def on_focus_in(event):
     """Change the text color to black on focus in."""
@@ -12,19 +17,13 @@ def on_focus_out(event):
     if not event.widget.get():
         event.widget.config(fg="black")
 
-def update_column_mapping(RSRP_columns, CINR_columns):
-    """Update column mapping based on user input."""
-    column_mapping = {}
-    for i, col in enumerate(RSRP_columns):
-        if col:
-            column_mapping[col] = f'R{i+1} CINR (0)'
-    for i, col in enumerate(CINR_columns):
-        if col:
-            column_mapping[f'R{i+1} RSRP (dBm)'] = col
-    return column_mapping
-
-def process_csv_files(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions):
-    """Process CSV files in a directory."""
+def process_csv_files(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, cache=None, columnar=False,
+                      report=None):
+    """Process CSV files in a directory, answering unchanged files from the cache.
+
+    Each row is also streamed to the report as soon as its file is done, and
+    files the report already holds from an interrupted run are skipped.
+    """
     results = []
     if not os.path.isdir(directory):
         messagebox.showerror("Error", "Invalid directory selected.")
@@ -32,35 +31,98 @@ def process_csv_files(directory, RSRP_columns, CINR_columns, RSRP_conditions, CI
 
     for entry in os.scandir(directory):
         if entry.is_dir():
-            results.extend(process_csv_files(entry.path, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions))
-        elif entry.is_file() and entry.name.endswith('.csv'):
+            results.extend(process_csv_files(entry.path, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, cache, columnar,
+                                             report))
+        elif entry.is_file() and is_data_csv(entry.name):
+            if report is not None and report.is_done(entry.path):
+                continue
             try:
-                df = pd.read_csv(entry.path)
-                column_mapping = update_column_mapping(RSRP_columns, CINR_columns)
-                if any(col in df.columns for col in column_mapping.keys()):
-                    RSRP_cols = [col for col in RSRP_columns if col in df.columns]
-                    CINR_cols = [col for col in CINR_columns if col in df.columns]
-
-                    # Drop rows with missing values in the specified columns
-                    df = df.dropna(subset=RSRP_cols + CINR_cols)
-
-                    df_filtered_RSRP = df[df[RSRP_cols].apply(lambda x: x >= RSRP_conditions).any(axis=1)]
-                    df_filtered_CINR = df[df[CINR_cols].apply(lambda x: x >= CINR_conditions).any(axis=1)]
+                found, result = cache.get(entry.path) if cache is not None else (False, None)
+                if not found:
+                    result = analyze_file(entry.path, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions,
+                                          columnar=columnar)
+                    if cache is not None:
+                        cache.put(entry.path, result)
+                if report is not None:
+                    report.add(entry.path, result)
+                if result is not None:
+                    results.append(result)
+            except Exception as e:
+                log_sink.log(f"Error processing {entry.name}: {str(e)}", level='warning', path=entry.path)
 
-                    percentage_RSRP = round((len(df_filtered_RSRP) / len(df)) * 100) if len(df) > 0 else 0
-                    percentage_CINR = round((len(df_filtered_CINR) / len(df)) * 100) if len(df) > 0 else 0
+    return results
 
-                    results.append({'File': entry.name, 'RSRP': f"{percentage_RSRP}%", 'CINR': f"{percentage_CINR}%"})
-            except Exception as e:
-                messagebox.showwarning("Warning", f"Error processing {entry.name}: {str(e)}")
 
+def process_csv_files_parallel(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, workers, cache=None, columnar=False,
+                               report=None):
+    """Process CSV files in a directory on a pool of worker processes."""
+    if not os.path.isdir(directory):
+        messagebox.showerror("Error", "Invalid directory selected.")
+        return []
+
+    # Only repaint while waiting so the Run button cannot be pressed again mid-run
+    results, warnings = analyze_directory(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions,
+                                          workers=workers, progress=lambda done, total: root.update_idletasks(),
+                                          cache=cache, columnar=columnar,
+                                          skip=report.done if report is not None else None,
+                                          on_result=report.add if report is not None else None)
+    for warning in warnings:
+        log_sink.log(warning, level='warning')
     return results
 
 
+def write_sweep(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, workers, columnar=False):
+    """Write coverage at every predefined threshold and the CDFs from one read per file."""
+    file_histograms, warnings = sweep_directory(directory, RSRP_columns, CINR_columns, workers=workers,
+                                                progress=lambda done, total: root.update_idletasks(),
+                                                columnar=columnar)
+    for warning in warnings:
+        log_sink.log(warning, level='warning')
+
+    # The selected conditions are swept as well, even when they are not in the predefined lists
+    RSRP_thresholds = sorted({int(c) for c in predefined_conditions_rsrp} | ({RSRP_conditions} if RSRP_conditions is not None else set()))
+    CINR_thresholds = sorted({int(c) for c in predefined_conditions_cinr} | ({CINR_conditions} if CINR_conditions is not None else set()))
+
+    results = [histogram_result(name, histograms, RSRP_conditions, CINR_conditions) for name, histograms in file_histograms]
+    output_file = os.path.join(directory, "Output.xlsx")
+    write_workbook(output_file, [
+        ("Sheet1", results),
+        ("RSRP Sweep", sweep_table(file_histograms, 'RSRP', RSRP_thresholds)),
+        ("CINR Sweep", sweep_table(file_histograms, 'CINR', CINR_thresholds)),
+        ("RSRP CDF", cdf_table(file_histograms, 'RSRP')),
+        ("CINR CDF", cdf_table(file_histograms, 'CINR')),
+    ])
+    return output_file
+
+
+def write_grid(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, bin_size, workers, columnar=False):
+    """Aggregate every file into one coverage grid and export it as CSV and GeoJSON."""
+    grid, warnings = grid_directory(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, bin_size,
+                                    workers=workers, progress=lambda done, total: root.update_idletasks(),
+                                    columnar=columnar)
+    for warning in warnings:
+        log_sink.log(warning, level='warning')
+
+    csv_file = os.path.join(directory, f"{GRID_OUTPUT}.csv")
+    geojson_file = os.path.join(directory, f"{GRID_OUTPUT}.geojson")
+    export_csv(csv_file, grid, bin_size)
+    export_geojson(geojson_file, grid, bin_size)
+    return csv_file, geojson_file
+
+
+def show_success(message, warnings_before):
+    """Log the outcome and show it, with the number of warnings logged during the run."""
+    log_sink.log(message)
+    warnings = log_sink.counts['warning'] - warnings_before
+    if warnings:
+        message += f"\n{warnings} files had problems, see {log_sink.log_file}"
+    messagebox.showinfo("Success", message)
+
 def run_analysis():
     """Run the analysis based on user inputs."""
     directory = filedialog.askdirectory(title="Select Directory")
     if directory:
+        warnings_before = log_sink.counts['warning']
         try:
             RSRP_columns = [RSRP1_entry.get(), RSRP2_entry.get(), RSRP3_entry.get()]
             CINR_columns = [CINR1_entry.get(), CINR2_entry.get(), CINR3_entry.get()]
@@ -82,11 +144,79 @@ def run_analysis():
                     messagebox.showwarning("Warning", "CINR Condition should be an integer.")
                     return
             
-            results = process_csv_files(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions)
-            output_df = pd.DataFrame(results)
+            workers = 1
+            if workers_entry.get():
+                try:
+                    workers = int(workers_entry.get())
+                except ValueError:
+                    messagebox.showwarning("Warning", "Workers should be an integer.")
+                    return
+            
+            if sweep_var.get():
+                output_file = write_sweep(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, workers, columnar_var.get())
+                show_success(f"Threshold sweep completed. Results saved to {output_file}", warnings_before)
+                return
+            
+            if grid_entry.get():
+                try:
+                    bin_size = float(grid_entry.get())
+                except ValueError:
+                    messagebox.showwarning("Warning", "Grid Size should be a number.")
+                    return
+                if not bin_size > 0:
+                    messagebox.showwarning("Warning", "Grid Size should be a positive number.")
+                    return
+                csv_file, geojson_file = write_grid(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, bin_size, workers,
+                                                    columnar_var.get())
+                show_success(f"Coverage grid completed. Results saved to {csv_file} and {geojson_file}", warnings_before)
+                return
+            
+            settings = [RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions]
+            cache = None
+            if cache_var.get():
+                try:
+                    cache = KPICache(directory, settings)
+                except Exception as e:
+                    messagebox.showwarning("Warning", f"Result cache unavailable, analysing every file: {str(e)}")
+            
+            # Rows are streamed to a side file so a crash does not lose the work done so far
             output_file = os.path.join(directory, "Output.xlsx")
-            output_df.to_excel(output_file, index=False)
-            messagebox.showinfo("Success", f"Analysis completed. Results saved to {output_file}")
+            # Only a run with the same columns and conditions can pick up where the last one stopped
+            previous = partial_settings(output_file)
+            resume = False
+            if previous == encode_settings(settings):
+                resume = messagebox.askyesno("Resume", "An interrupted analysis was found in this directory. Resume it?")
+            elif previous is not None:
+                messagebox.showinfo("Info", "An interrupted analysis with different columns or conditions was found "
+                                            "in this directory; starting a new one.")
+            report = ReportWriter(output_file, settings, resume=resume)
+            
+            try:
+                if workers > 1:
+                    process_csv_files_parallel(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, workers, cache, columnar_var.get(),
+                                               report)
+                else:
+                    process_csv_files(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, cache, columnar_var.get(),
+                                      report)
+                report.finish()
+            finally:
+                report.close()
+                if cache is not None:
+                    cache.close()
+            show_success(f"Analysis completed. Results saved to {output_file}", warnings_before)
+        except Exception as e:
+            log_sink.log(f"An error occurred: {str(e)}", level='error')
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+def clear_result_cache():
+    """Delete the result cache of a directory so every file is analysed again."""
+    directory = filedialog.askdirectory(title="Select Directory")
+    if directory:
+        try:
+            if clear_cache(directory):
+                messagebox.showinfo("Success", "Result cache cleared.")
+            else:
+                messagebox.showinfo("Info", "No result cache found in the selected directory.")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
@@ -112,87 +242,139 @@ def refresh_interface():
     CINR3_entry.set('')
     RSRP_condition_entry.set('')
     CINR_condition_entry.set('')
+    workers_entry.set(default_workers)
+    cache_var.set(True)
+    sweep_var.set(False)
+    columnar_var.set(False)
+    grid_entry.set('')
 
 # Predefined column names and conditions
 predefined_rsrp_columns = ['R0 RSRP (0)', 'R0 RSRP (1)', 'SSB_RP (0)', 'SSB_RP (1)']
 predefined_cinr_columns = ['R0 RS CINR (0)', 'SSB_CINR (0)']
 predefined_conditions_rsrp = [str(i) for i in range(-120, -60, 5)]  # Example conditions for RSRP
 predefined_conditions_cinr = [str(i) for i in range(1, 11)]  # Predefined conditions for CINR (1 to 10)
+predefined_grid_sizes = [str(size) for size in GRID_SIZES]  # Bin sizes in metres for the coverage grid
+predefined_workers = [str(i) for i in range(1, (os.cpu_count() or 1) + 1)]  # 1 runs serially on the Tk thread
+default_workers = predefined_workers[-1]
+
+# Worker processes re-import this script, so only build the GUI when run directly
+if __name__ == '__main__':
+    # Create the main application window
+    # Per-file warnings and outcomes go to a JSON-lines log instead of one dialog each
+    log_sink = LogSink('KPI')
+
+    root = tk.Tk()
+    root.title("DTS_Software")
+    root.configure(background="#000")
+
+    # Create a frame for layout
+    frame = tk.Frame(root, padx=120, pady=100, bg="#e1d0ba", highlightbackground="#000")
+    frame.pack()
+
+    # Labels and Comboboxes for RSRP columns and conditions
+    RSRP_label = tk.Label(frame, text="RSRP Columns:", bg="#e1d0ba", font=('Helvetica Bold', 12))
+    RSRP_label.grid(row=0, column=0, padx=10, pady=5)
 
-# Create the main application window
-root = tk.Tk()
-root.title("DTS_Software")
-root.configure(background="#000")
+    RSRP1_entry = ttk.Combobox(frame, values=predefined_rsrp_columns)
+    RSRP1_entry.grid(row=1, column=1, padx=5, pady=5)
 
-# Create a frame for layout
-frame = tk.Frame(root, padx=120, pady=100, bg="#e1d0ba", highlightbackground="#000")
-frame.pack()
+    RSRP2_entry = ttk.Combobox(frame, values=predefined_rsrp_columns)
+    RSRP2_entry.grid(row=2, column=1, padx=5, pady=5)
 
-# Labels and Comboboxes for RSRP columns and conditions
-RSRP_label = tk.Label(frame, text="RSRP Columns:", bg="#e1d0ba", font=('Helvetica Bold', 12))
-RSRP_label.grid(row=0, column=0, padx=10, pady=5)
+    RSRP3_entry = ttk.Combobox(frame, values=predefined_rsrp_columns)
+    RSRP3_entry.grid(row=3, column=1, padx=5, pady=5)
 
-RSRP1_entry = ttk.Combobox(frame, values=predefined_rsrp_columns)
-RSRP1_entry.grid(row=1, column=1, padx=5, pady=5)
+    RSRP_condition_label = tk.Label(frame, text="RSRP Condition:", bg="#e1d0ba", font=('Helvetica Bold', 12))
+    RSRP_condition_label.grid(row=7, column=0, padx=10, pady=5)
 
-RSRP2_entry = ttk.Combobox(frame, values=predefined_rsrp_columns)
-RSRP2_entry.grid(row=2, column=1, padx=5, pady=5)
+    RSRP_condition_entry = ttk.Combobox(frame, values=predefined_conditions_rsrp)
+    RSRP_condition_entry.grid(row=7, column=1, padx=10, pady=5)
 
-RSRP3_entry = ttk.Combobox(frame, values=predefined_rsrp_columns)
-RSRP3_entry.grid(row=3, column=1, padx=5, pady=5)
+    # Labels and Comboboxes for CINR columns and conditions
+    CINR_label = tk.Label(frame, text="CINR Columns:", bg="#e1d0ba", font=('Helvetica Bold', 12))
+    CINR_label.grid(row=0, column=2, padx=10, pady=5)
 
-RSRP_condition_label = tk.Label(frame, text="RSRP Condition:", bg="#e1d0ba", font=('Helvetica Bold', 12))
-RSRP_condition_label.grid(row=7, column=0, padx=10, pady=5)
+    CINR1_entry = ttk.Combobox(frame, values=predefined_cinr_columns)
+    CINR1_entry.grid(row=1, column=3, padx=5, pady=5)
 
-RSRP_condition_entry = ttk.Combobox(frame, values=predefined_conditions_rsrp)
-RSRP_condition_entry.grid(row=7, column=1, padx=10, pady=5)
+    CINR2_entry = ttk.Combobox(frame, values=predefined_cinr_columns)
+    CINR2_entry.grid(row=2, column=3, padx=5, pady=5)
 
-# Labels and Comboboxes for CINR columns and conditions
-CINR_label = tk.Label(frame, text="CINR Columns:", bg="#e1d0ba", font=('Helvetica Bold', 12))
-CINR_label.grid(row=0, column=2, padx=10, pady=5)
+    CINR3_entry = ttk.Combobox(frame, values=predefined_cinr_columns)
+    CINR3_entry.grid(row=3, column=3, padx=5, pady=5)
 
-CINR1_entry = ttk.Combobox(frame, values=predefined_cinr_columns)
-CINR1_entry.grid(row=1, column=3, padx=5, pady=5)
+    CINR_condition_label = tk.Label(frame, text="CINR Condition:", bg="#e1d0ba", font=('Helvetica Bold', 12))
+    CINR_condition_label.grid(row=7, column=2, padx=10, pady=5)
 
-CINR2_entry = ttk.Combobox(frame, values=predefined_cinr_columns)
-CINR2_entry.grid(row=2, column=3, padx=5, pady=5)
+    CINR_condition_entry = ttk.Combobox(frame, values=predefined_conditions_cinr)
+    CINR_condition_entry.grid(row=7, column=3, padx=10, pady=5)
 
-CINR3_entry = ttk.Combobox(frame, values=predefined_cinr_columns)
-CINR3_entry.grid(row=3, column=3, padx=5, pady=5)
+    # Label and Combobox for the number of worker processes
+    workers_label = tk.Label(frame, text="Workers:", bg="#e1d0ba", font=('Helvetica Bold', 12))
+    workers_label.grid(row=8, column=0, padx=10, pady=5)
 
-CINR_condition_label = tk.Label(frame, text="CINR Condition:", bg="#e1d0ba", font=('Helvetica Bold', 12))
-CINR_condition_label.grid(row=7, column=2, padx=10, pady=5)
+    workers_entry = ttk.Combobox(frame, values=predefined_workers)
+    workers_entry.set(default_workers)
+    workers_entry.grid(row=8, column=1, padx=10, pady=5)
 
-CINR_condition_entry = ttk.Combobox(frame, values=predefined_conditions_cinr)
-CINR_condition_entry.grid(row=7, column=3, padx=10, pady=5)
+    # Reuse results of unchanged files from the previous run
+    cache_var = tk.BooleanVar(value=True)
+    cache_checkbutton = tk.Checkbutton(frame, text="Use Cache", variable=cache_var, bg="#e1d0ba", font=('Helvetica Bold', 12))
+    cache_checkbutton.grid(row=8, column=2, padx=10, pady=5)
 
-# Run Button
-run_button = tk.Button(frame, text="Run Analysis", command=run_analysis,
-                       bg="#e1d0ba", fg="#000",
-                       borderwidth=2, relief="groove",
-                       padx=10, pady=5)
-run_button.grid(row=10, column=1, columnspan=2, padx=10, pady=10)
-run_button.bind("<Enter>", lambda event, btn=run_button: on_hover(event, btn))
-run_button.bind("<Leave>", lambda event, btn=run_button: on_leave(event, btn))
+    # Coverage at every predefined threshold instead of only the selected ones
+    sweep_var = tk.BooleanVar(value=False)
+    sweep_checkbutton = tk.Checkbutton(frame, text="Sweep Mode", variable=sweep_var, bg="#e1d0ba", font=('Helvetica Bold', 12))
+    sweep_checkbutton.grid(row=8, column=3, padx=10, pady=5)
 
-# Refresh Button
-refresh_button = tk.Button(frame, text="Refresh", command=refresh_interface,
+    # Read Feather copies of the CSVs, converting each file once (requires pyarrow)
+    columnar_var = tk.BooleanVar(value=False)
+    columnar_checkbutton = tk.Checkbutton(frame, text="Columnar Cache", variable=columnar_var, bg="#e1d0ba", font=('Helvetica Bold', 12))
+    columnar_checkbutton.grid(row=9, column=2, padx=10, pady=5)
+
+    # Label and Combobox for the coverage grid bin size; leave empty for the per-file analysis
+    grid_label = tk.Label(frame, text="Grid Size (m):", bg="#e1d0ba", font=('Helvetica Bold', 12))
+    grid_label.grid(row=9, column=0, padx=10, pady=5)
+
+    grid_entry = ttk.Combobox(frame, values=predefined_grid_sizes)
+    grid_entry.grid(row=9, column=1, padx=10, pady=5)
+
+    # Run Button
+    run_button = tk.Button(frame, text="Run Analysis", command=run_analysis,
                            bg="#e1d0ba", fg="#000",
                            borderwidth=2, relief="groove",
                            padx=10, pady=5)
-refresh_button.grid(row=10, column=0, columnspan=1, padx=10, pady=10)
-refresh_button.bind("<Enter>", lambda event, btn=refresh_button: on_hover(event, btn))
-refresh_button.bind("<Leave>", lambda event, btn=refresh_button: on_leave(event, btn))
-
-# Exit Button
-exit_button = tk.Button(frame, text="Exit", command=exit_application,
-                        bg="#e1d0ba", fg="#000",
-                        borderwidth=2, relief="groove",
-                        padx=10, pady=5)
-exit_button.grid(row=10, column=3, columnspan=4, padx=10, pady=10)
-exit_button.bind("<Enter>", lambda event, btn=exit_button: on_hover(event, btn))
-exit_button.bind("<Leave>", lambda event, btn=exit_button: on_leave(event, btn))
-
-# Run the Tkinter event loop
-root.mainloop()
-
+    run_button.grid(row=10, column=1, columnspan=2, padx=10, pady=10)
+    run_button.bind("<Enter>", lambda event, btn=run_button: on_hover(event, btn))
+    run_button.bind("<Leave>", lambda event, btn=run_button: on_leave(event, btn))
+
+    # Refresh Button
+    refresh_button = tk.Button(frame, text="Refresh", command=refresh_interface,
+                               bg="#e1d0ba", fg="#000",
+                               borderwidth=2, relief="groove",
+                               padx=10, pady=5)
+    refresh_button.grid(row=10, column=0, columnspan=1, padx=10, pady=10)
+    refresh_button.bind("<Enter>", lambda event, btn=refresh_button: on_hover(event, btn))
+    refresh_button.bind("<Leave>", lambda event, btn=refresh_button: on_leave(event, btn))
+
+    # Clear Cache Button
+    clear_cache_button = tk.Button(frame, text="Clear Cache", command=clear_result_cache,
+                                   bg="#e1d0ba", fg="#000",
+                                   borderwidth=2, relief="groove",
+                                   padx=10, pady=5)
+    clear_cache_button.grid(row=11, column=1, columnspan=2, padx=10, pady=10)
+    clear_cache_button.bind("<Enter>", lambda event, btn=clear_cache_button: on_hover(event, btn))
+    clear_cache_button.bind("<Leave>", lambda event, btn=clear_cache_button: on_leave(event, btn))
+
+    # Exit Button
+    exit_button = tk.Button(frame, text="Exit", command=exit_application,
+                            bg="#e1d0ba", fg="#000",
+                            borderwidth=2, relief="groove",
+                            padx=10, pady=5)
+    exit_button.grid(row=10, column=3, columnspan=4, padx=10, pady=10)
+    exit_button.bind("<Enter>", lambda event, btn=exit_button: on_hover(event, btn))
+    exit_button.bind("<Leave>", lambda event, btn=exit_button: on_leave(event, btn))
+
+    # Run the Tkinter event loop
+    root.mainloop()
+    log_sink.close()
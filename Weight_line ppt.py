@@ -2,55 +2,46 @@ import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter.scrolledtext import ScrolledText
-from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
-from pptx.util import Pt
 from tkinter import ttk
 from tkinter.font import Font
+from log_sink import LogSink
+from tk_log_view import TkLogView
+from slide_transforms import FAILED
+from ppt_batch import DeckJob, border_deck
 import tkinter.simpledialog as sd
-# Function to adjust the border width of pictures in PowerPoint files
-from pptx.dml.color import RGBColor
-
-def adjust_picture_border(file_paths, weight, log_text):
-    # Black color (RGB)
-    black_color = RGBColor(0, 0, 0)
-
-    for pptx_path in file_paths:
-        log_text.insert(tk.END, f"Processing {pptx_path}...\n")
-        log_text.update()
-
-        try:
-            prs = Presentation(pptx_path)
-        except Exception as e:
-            log_text.insert(tk.END, f"Error opening the presentation {pptx_path}: {e}\n")
-            log_text.update()
-            continue
-
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                    # Create a border for the picture shape
-                    picture_format = shape.line
-                    if picture_format is not None:
-                        picture_format.fill.solid()
-                        picture_format.fill.fore_color.rgb = black_color
-                        picture_format.width = Pt(float(weight))
-                    else:
-                        picture_format = shape.line.format
-                        picture_format.fill.solid()
-                        picture_format.fill.fore_color.rgb = black_color
-                        picture_format.width = Pt(float(weight))
-
-        try:
-            prs.save(pptx_path)
-            log_text.insert(tk.END, f"Border width adjusted successfully for {pptx_path}\n")
-            log_text.update()
-        except Exception as e:
-            log_text.insert(tk.END, f"Error saving the presentation {pptx_path}: {e}\n")
-            log_text.update()
-    messagebox.showinfo("Processing Complete", "All PowerPoint files processed successfully!")
-
 
+# Milliseconds between checks for finished decks
+POLL_INTERVAL = 100
+
+# Media optimization choices; Off leaves images as they are
+MEDIA_DPI_VALUES = ['Off', 96, 150, 220, 300]
+
+# Decks are processed on worker processes; the Tk loop only polls for their outcomes
+def start_border_adjustment(file_paths, weight, media_dpi='Off'):
+    media_dpi = None if media_dpi == 'Off' else int(media_dpi)
+    job = DeckJob(border_deck, file_paths, (weight, media_dpi))
+    if not job.paths:
+        messagebox.showwarning("Warning", "No PowerPoint files selected.")
+        return
+    execute_button.config(state=tk.DISABLED)
+    log_sink.log(f"Processing {len(job.paths)} presentations on {min(job.workers, len(job.paths))} processes...")
+    job.start()
+    root.after(POLL_INTERVAL, poll_deck_job, job)
+
+def poll_deck_job(job):
+    for pptx_path, status, message in job.drain():
+        log_sink.log(message, level="error" if status == FAILED else "info", path=pptx_path, status=status)
+    if not job.finished.is_set():
+        root.after(POLL_INTERVAL, poll_deck_job, job)
+        return
+
+    execute_button.config(state=tk.NORMAL)
+    log_sink.log(job.summary())
+    log_view.flush()
+    if job.failures:
+        messagebox.showwarning("Processing Complete", f"{job.summary()}, see the log.")
+    else:
+        messagebox.showinfo("Processing Complete", f"All PowerPoint files processed successfully!\n{job.summary()}")
 
 # Function to browse files and trigger processing
 def browse_files(file_entry, weight_combo, log_text):
@@ -101,42 +92,56 @@ def select_folder(dialog, file_entry):
 
 
 
-# Create Tkinter window
-root = tk.Tk()
-root.title("W8 Adjustment Tool")
-root.geometry("700x400")
-root.configure(bg='#e1d0ba')  # Set background color
-
-# Bold font
-bold_font = Font(family="Helvetica", size=10, weight="bold")
-
-# File entry label and widget
-file_label = tk.Label(root, bg='#e1d0ba', text="Select PowerPoint file(s):", font=('Helvetica Bold', 12))
-file_label.grid(row=0, column=0, sticky="w", padx=10, pady=10)  # Align to the west (left)
-file_entry = tk.Entry(root,bg='#EEEEEE', width=60)
-file_entry.grid(row=0, column=1, padx=10, pady=10, sticky="we")  # Align to the west and east (left and right)
-
-# Browse button for files
-browse_button = tk.Button(root, bg='#e1d0ba', text="Browse", font=('Helvetica Bold', 12), command=lambda: browse_files(file_entry, weight_combo, log_text))
-browse_button.grid(row=0, column=2, padx=10, pady=10)  # Set position and size
-
-# Weight selection label and widget
-weight_values = [1.5,1,2,2.5,3,3.5,4,4.5,6,6.5]  # Updated weight values
-weight_label = tk.Label(root, bg='#e1d0ba', text="Weight:", font=('Helvetica Bold', 12))
-weight_label.grid(row=1, column=0, sticky="w", padx=10, pady=10)  # Align to the west (left)
-weight_combo = ttk.Combobox(root, values=weight_values, width=5, state="readonly")
-weight_combo.current(0)  # Set default selection
-weight_combo.grid(row=1, column=1, padx=10, pady=10, sticky="we")  # Align to the west and east (left and right)
-
-# Log display label and widget
-log_label = tk.Label(root, bg='#e1d0ba', text="Log:", font=('Helvetica Bold', 12))
-log_label.grid(row=2, column=0, sticky="w", padx=10, pady=10)  # Align to the west (left)
-log_text = ScrolledText(root,  bg='#EEEEEE',height=10, width=60)
-log_text.grid(row=3, column=0, columnspan=3, padx=10, pady=10, sticky="we")  # Span across three columns
-
-# Execute button
-execute_button = tk.Button(root, bg='#e1d0ba', text="Execute", font=('Helvetica Bold', 12), command=lambda: adjust_picture_border(file_entry.get().split("\n"), str(weight_combo.get()), log_text))
-execute_button.grid(row=4, column=0, columnspan=3, padx=10, pady=10, sticky="we")  # Span across three columns
-
-# Start GUI event loop
-root.mainloop()
+# Worker processes re-import this script, so only build the GUI when run directly
+if __name__ == '__main__':
+    # Create Tkinter window
+    root = tk.Tk()
+    root.title("W8 Adjustment Tool")
+    root.geometry("700x400")
+    root.configure(bg='#e1d0ba')  # Set background color
+
+    # Bold font
+    bold_font = Font(family="Helvetica", size=10, weight="bold")
+
+    # File entry label and widget
+    file_label = tk.Label(root, bg='#e1d0ba', text="Select PowerPoint file(s):", font=('Helvetica Bold', 12))
+    file_label.grid(row=0, column=0, sticky="w", padx=10, pady=10)  # Align to the west (left)
+    file_entry = tk.Entry(root,bg='#EEEEEE', width=60)
+    file_entry.grid(row=0, column=1, padx=10, pady=10, sticky="we")  # Align to the west and east (left and right)
+
+    # Browse button for files
+    browse_button = tk.Button(root, bg='#e1d0ba', text="Browse", font=('Helvetica Bold', 12), command=lambda: browse_files(file_entry, weight_combo, log_text))
+    browse_button.grid(row=0, column=2, padx=10, pady=10)  # Set position and size
+
+    # Weight selection label and widget
+    weight_values = [1.5,1,2,2.5,3,3.5,4,4.5,6,6.5]  # Updated weight values
+    weight_label = tk.Label(root, bg='#e1d0ba', text="Weight:", font=('Helvetica Bold', 12))
+    weight_label.grid(row=1, column=0, sticky="w", padx=10, pady=10)  # Align to the west (left)
+    weight_combo = ttk.Combobox(root, values=weight_values, width=5, state="readonly")
+    weight_combo.current(0)  # Set default selection
+    weight_combo.grid(row=1, column=1, padx=10, pady=10, sticky="we")  # Align to the west and east (left and right)
+
+    # Log display label and widget
+    log_label = tk.Label(root, bg='#e1d0ba', text="Log:", font=('Helvetica Bold', 12))
+    log_label.grid(row=2, column=0, sticky="w", padx=10, pady=10)  # Align to the west (left)
+    log_text = ScrolledText(root,  bg='#EEEEEE',height=10, width=60)
+    log_text.grid(row=3, column=0, columnspan=3, padx=10, pady=10, sticky="we")  # Span across three columns
+    # Log lines are batched into the widget and kept in full in a JSON-lines file
+    log_sink = LogSink('Weight_line ppt')
+    log_view = TkLogView(log_text, log_sink)
+    log_view.start()
+
+    # Merge duplicate images and shrink oversized ones to this many pixels per inch of their on-slide size
+    media_label = tk.Label(root, bg='#e1d0ba', text="Media DPI:", font=('Helvetica Bold', 12))
+    media_label.grid(row=2, column=1, sticky="e", padx=10)
+    media_combo = ttk.Combobox(root, values=MEDIA_DPI_VALUES, width=5, state="readonly")
+    media_combo.current(0)  # Off by default
+    media_combo.grid(row=2, column=2, sticky="w", pady=10)
+
+    # Execute button
+    execute_button = tk.Button(root, bg='#e1d0ba', text="Execute", font=('Helvetica Bold', 12), command=lambda: start_border_adjustment(file_entry.get().split("\n"), str(weight_combo.get()), media_combo.get()))
+    execute_button.grid(row=4, column=0, columnspan=3, padx=10, pady=10, sticky="we")  # Span across three columns
+
+    # Start GUI event loop
+    root.mainloop()
+    log_sink.close()
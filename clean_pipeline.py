@@ -0,0 +1,187 @@
+import os
+import queue
+import threading
+import time
+from pandas import DataFrame
+from csv_cleaning import clean_chunk, open_sink
+from csv_stream import read_header, iter_chunks
+
+# Chunks each queue between two stages can hold before the upstream stage waits
+PIPELINE_DEPTH = 4
+# Seconds between checks for a stopped pipeline while a stage waits on a queue
+POLL_TIMEOUT = 0.1
+
+_END = object()
+
+
+class StageStats:
+    """Work done by one pipeline stage and the time it spent working or waiting."""
+
+    def __init__(self, name):
+        self.name = name
+        self.chunks = 0
+        self.rows = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    def summary(self):
+        rate = self.rows / self.busy if self.busy else 0.0
+        return (f"{self.name}: {self.rows} rows in {self.chunks} chunks, {self.busy:.1f}s busy "
+                f"({rate:,.0f} rows/s), {self.starved:.1f}s waiting for input, {self.blocked:.1f}s waiting for output")
+
+
+class CleaningPipeline:
+    """Clean many CSV files with reading, cleaning and writing on separate threads.
+
+    The stages pass chunks through bounded queues of ``depth`` items: the
+    reader prefetches the next files while earlier chunks are cleaned and
+    written, and waits whenever the stage after it falls behind.
+    """
+
+    def __init__(self, columns_to_clean, desired_value, depth=PIPELINE_DEPTH, cancelled=None):
+        self.columns_to_clean = list(dict.fromkeys(columns_to_clean))
+        self.desired_value = desired_value
+        self.depth = depth
+        self.cancelled = cancelled
+        self.stopped = threading.Event()
+        self.stats = [StageStats('read'), StageStats('clean'), StageStats('write')]
+
+    def is_stopped(self):
+        if self.cancelled is not None and self.cancelled():
+            self.stopped.set()
+        return self.stopped.is_set()
+
+    def put(self, out_queue, item, stats):
+        if self.is_stopped():
+            return False
+        start = time.perf_counter()
+        while True:
+            try:
+                out_queue.put(item, timeout=POLL_TIMEOUT)
+                stats.blocked += time.perf_counter() - start
+                return True
+            except queue.Full:
+                if self.is_stopped():
+                    return False
+
+    def get(self, in_queue, stats):
+        start = time.perf_counter()
+        while True:
+            try:
+                item = in_queue.get(timeout=POLL_TIMEOUT)
+                stats.starved += time.perf_counter() - start
+                return item
+            except queue.Empty:
+                if self.is_stopped():
+                    return None
+
+    def read(self, jobs, out_queue):
+        stats = self.stats[0]
+        for job in jobs:
+            start = time.perf_counter()
+            try:
+                for df in iter_chunks(job[0]):
+                    stats.busy += time.perf_counter() - start
+                    stats.chunks += 1
+                    stats.rows += len(df)
+                    if not self.put(out_queue, (job, df), stats):
+                        return
+                    start = time.perf_counter()
+                stats.busy += time.perf_counter() - start
+                item = (job, _END)
+            except Exception as e:
+                item = (job, e)
+            if not self.put(out_queue, item, stats):
+                return
+        self.put(out_queue, None, stats)
+
+    def clean(self, in_queue, out_queue):
+        stats = self.stats[1]
+        while True:
+            item = self.get(in_queue, stats)
+            if item is None:
+                self.put(out_queue, None, stats)
+                return
+            job, df = item
+            if isinstance(df, DataFrame):
+                start = time.perf_counter()
+                try:
+                    df = clean_chunk(df, self.columns_to_clean, self.desired_value)
+                    stats.chunks += 1
+                    stats.rows += len(df)
+                except Exception as e:
+                    df = e
+                stats.busy += time.perf_counter() - start
+            if not self.put(out_queue, (job, df), stats):
+                return
+
+    def run(self, jobs, on_done=None):
+        """Clean ``(source, destination)`` jobs in order and return True unless cancelled.
+
+        ``on_done(source, destination, error)`` is called on the calling thread
+        as each file is finished, with ``error`` None on success. A failed file
+        has its partial output removed and does not stop the others.
+        """
+        read_queue = queue.Queue(maxsize=self.depth)
+        write_queue = queue.Queue(maxsize=self.depth)
+        threads = [threading.Thread(target=self.read, args=(jobs, read_queue), daemon=True),
+                   threading.Thread(target=self.clean, args=(read_queue, write_queue), daemon=True)]
+        for thread in threads:
+            thread.start()
+
+        stats = self.stats[2]
+        sinks = {}
+        failed = set()
+        try:
+            while True:
+                item = self.get(write_queue, stats)
+                if item is None or self.is_stopped():
+                    break
+                job, df = item
+                source, destination = job
+                if job in failed:
+                    continue
+                start = time.perf_counter()
+                finished = df is _END or isinstance(df, Exception)
+                error = None
+                try:
+                    if isinstance(df, Exception):
+                        raise df
+                    if df is _END:
+                        sink = sinks.pop(job, None)
+                        if sink is None:
+                            # Header-only source: still produce a file with the header row
+                            sink = open_sink(destination)
+                            sink.write(DataFrame(columns=read_header(source)))
+                        sink.close()
+                    else:
+                        if job not in sinks:
+                            sinks[job] = open_sink(destination)
+                        sinks[job].write(df)
+                        stats.chunks += 1
+                        stats.rows += len(df)
+                except Exception as e:
+                    sinks.pop(job, None)
+                    failed.add(job)
+                    remove_output(destination)
+                    finished = True
+                    error = e
+                stats.busy += time.perf_counter() - start
+                if finished and on_done is not None:
+                    on_done(source, destination, error)
+        finally:
+            self.stopped.set()
+            for thread in threads:
+                thread.join()
+            # Files cut short by a cancel leave no partial output behind
+            for source, destination in sinks:
+                remove_output(destination)
+        return not (self.cancelled is not None and self.cancelled())
+
+
+def remove_output(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
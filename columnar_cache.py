@@ -0,0 +1,82 @@
+import os
+from csv_schema import arrow_types_for
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; without it every read falls back to the CSV
+    pa = None
+
+# Folder created next to each CSV to hold its columnar copy
+CACHE_DIR = '.columnar'
+
+
+def columnar_path(csv_path):
+    """Return where the columnar copy of a CSV file is kept."""
+    folder, name = os.path.split(csv_path)
+    return os.path.join(folder, CACHE_DIR, os.path.splitext(name)[0] + '.feather')
+
+
+def source_fingerprint(csv_path):
+    """Return the size and modification time of a CSV file as Arrow metadata."""
+    stat = os.stat(csv_path)
+    return {b'source_size': str(stat.st_size).encode(), b'source_mtime_ns': str(stat.st_mtime_ns).encode()}
+
+
+def is_fresh(csv_path, cache_path):
+    """Check whether a columnar copy was written from the current version of its CSV."""
+    if not os.path.exists(cache_path):
+        return False
+    with pa.memory_map(cache_path) as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    fingerprint = source_fingerprint(csv_path)
+    return all(metadata.get(key) == value for key, value in fingerprint.items())
+
+
+def convert(csv_path, cache_path):
+    """Stream a CSV file into an uncompressed Feather file, batch by batch."""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    fingerprint = source_fingerprint(csv_path)
+    temp_path = cache_path + '.tmp'
+    try:
+        convert_options = pa_csv.ConvertOptions(column_types=arrow_types_for())
+        reader = pa_csv.open_csv(csv_path, convert_options=convert_options)
+        schema = reader.schema.with_metadata(fingerprint)
+        with pa.OSFile(temp_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        os.replace(temp_path, cache_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def ensure_columnar(csv_path):
+    """Return an up-to-date columnar copy of a CSV file, building it if needed.
+
+    Returns None when pyarrow is not installed or the file cannot be converted
+    (for example when a column changes type half way through), in which case
+    callers read the CSV itself.
+    """
+    if pa is None:
+        return None
+    cache_path = columnar_path(csv_path)
+    try:
+        if not is_fresh(csv_path, cache_path):
+            convert(csv_path, cache_path)
+    except (pa.ArrowException, OSError):
+        return None
+    return cache_path
+
+
+def iter_columnar_chunks(cache_path, columns=None):
+    """Yield a columnar copy batch by batch as DataFrames, memory-mapping only the requested columns."""
+    with pa.memory_map(cache_path) as source:
+        reader = pa.ipc.open_file(source)
+        names = reader.schema.names
+        selected = None if columns is None else [col for col in names if col in columns]
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if selected is not None:
+                batch = batch.select(selected)
+            yield batch.to_pandas()
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fast_copy import copy_file
+
+# Files copied at the same time; enough to hide the latency of network shares
+COPY_WORKERS = 4
+COPY_RETRIES = 2
+
+
+def file_checksum(path):
+    """Return the BLAKE2b digest of a file."""
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def verify_copy(source, target, checksum=False):
+    """Raise OSError if a copy differs from its source in size (or content with ``checksum``)."""
+    if os.path.getsize(source) != os.path.getsize(target):
+        raise OSError(f"size mismatch after copying '{source}'")
+    if checksum and file_checksum(source) != file_checksum(target):
+        raise OSError(f"checksum mismatch after copying '{source}'")
+
+
+class CopyJob:
+    """Copy many files on a bounded thread pool with retries, verification and byte progress.
+
+    The job runs on a background thread; the GUI polls ``copied_bytes``,
+    ``done_files`` and ``finished`` and reads ``failures`` at the end, so no
+    widget is touched from a worker thread. ``on_copied(source, target)`` is
+    called on the worker thread after each verified copy.
+    """
+
+    def __init__(self, pairs, workers=COPY_WORKERS, retries=COPY_RETRIES, checksum=False, on_copied=None):
+        self.pairs = list(pairs)
+        self.workers = workers
+        self.retries = retries
+        self.checksum = checksum
+        self.on_copied = on_copied
+        self.lock = threading.Lock()
+        self.total_bytes = 0
+        for source, target in self.pairs:
+            try:
+                self.total_bytes += os.path.getsize(source)
+            except OSError:
+                pass
+        self.copied_bytes = 0
+        self.done_files = 0
+        self.failures = []
+        self.finished = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(self.copy_one, self.pairs))
+        finally:
+            self.finished.set()
+
+    def advance(self, count):
+        with self.lock:
+            self.copied_bytes += count
+
+    def copy_one(self, pair):
+        source, target = pair
+        error = None
+        for attempt in range(self.retries + 1):
+            written = [0]
+
+            def progress(count):
+                written[0] += count
+                self.advance(count)
+
+            try:
+                copy_file(source, target, progress)
+                verify_copy(source, target, self.checksum)
+                if self.on_copied is not None:
+                    self.on_copied(source, target)
+                error = None
+                break
+            except Exception as e:
+                # Take back the bytes of the failed attempt before retrying
+                self.advance(-written[0])
+                error = e
+        with self.lock:
+            self.done_files += 1
+            if error is not None:
+                self.failures.append((source, target, str(error)))
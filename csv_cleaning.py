@@ -0,0 +1,98 @@
+import os
+from openpyxl import Workbook
+from pandas import DataFrame
+from csv_stream import read_header, iter_chunks
+
+# Rows per worksheet in an xlsx file; longer outputs continue on a new sheet
+EXCEL_MAX_ROWS = 1048576
+
+
+def clean_chunk(df, columns_to_clean, desired_value):
+    """Clean all selected columns of one chunk in a single pass.
+
+    With "missing" the rows where any selected column is empty are dropped
+    through one combined mask; any other value is replaced by NaN in every
+    selected column with one replace call.
+    """
+    if not columns_to_clean:
+        return df
+    if desired_value == "missing":
+        return df[df[columns_to_clean].notna().all(axis=1).to_numpy()]
+    return df.replace({column: {desired_value: float('nan')} for column in columns_to_clean})
+
+
+class CsvSink:
+    """Append cleaned chunks to a CSV file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.started = False
+
+    def write(self, df):
+        df.to_csv(self.path, index=False, mode='a' if self.started else 'w', header=not self.started)
+        self.started = True
+
+    def close(self):
+        pass
+
+
+class XlsxSink:
+    """Append cleaned chunks to a write-only (constant-memory) xlsx workbook."""
+
+    def __init__(self, path):
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.columns = None
+        self.sheet = None
+        self.rows = 0
+
+    def new_sheet(self):
+        self.sheet = self.workbook.create_sheet(f"Sheet{len(self.workbook.worksheets) + 1}")
+        self.sheet.append(self.columns)
+        self.rows = 1
+
+    def write(self, df):
+        if self.columns is None:
+            self.columns = [str(col) for col in df.columns]
+            self.new_sheet()
+        # Empty cells instead of NaN, which Excel cannot store
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if self.rows >= EXCEL_MAX_ROWS:
+                self.new_sheet()
+            self.sheet.append(row)
+            self.rows += 1
+
+    def close(self):
+        if self.sheet is None:
+            self.workbook.create_sheet("Sheet1")
+        self.workbook.save(self.path)
+
+
+def open_sink(path):
+    """Return the writer matching the extension of the destination file."""
+    if path.lower().endswith('.xlsx'):
+        return XlsxSink(path)
+    return CsvSink(path)
+
+
+def clean_file(csv_file_path, destination_file_path, columns_to_clean, desired_value, cancelled=None):
+    """Stream one CSV through the cleaning pipeline into a CSV or xlsx file.
+
+    Returns False, removing the partial output, if the job is cancelled mid-file.
+    """
+    columns_to_clean = list(dict.fromkeys(columns_to_clean))
+    sink = open_sink(destination_file_path)
+    written = False
+    for df in iter_chunks(csv_file_path):
+        if cancelled is not None and cancelled():
+            if os.path.exists(destination_file_path) and written:
+                os.remove(destination_file_path)
+            return False
+        sink.write(clean_chunk(df, columns_to_clean, desired_value))
+        written = True
+    if not written:
+        # Header-only source: still produce a file with the header row
+        sink.write(DataFrame(columns=read_header(csv_file_path)))
+    sink.close()
+    return True
@@ -0,0 +1,52 @@
+import os
+from pandas import DataFrame
+from csv_cleaning import clean_chunk, open_sink
+from csv_stream import read_header, iter_chunks
+
+# Column added to every merged row naming the file it came from
+SOURCE_COLUMN = 'Source File'
+
+
+def merged_columns(paths):
+    """Return the union of the headers of several CSV files, in first-seen order.
+
+    A source column left by an earlier merge is dropped, since it is filled in again.
+    """
+    columns = {}
+    for path in paths:
+        for col in read_header(path):
+            if col != SOURCE_COLUMN:
+                columns.setdefault(col, None)
+    return list(columns)
+
+
+def merge_csv_files(paths, destination_file_path, columns_to_clean, desired_value, cancelled=None, progress=None):
+    """Concatenate CSV files into one output, streaming chunk by chunk.
+
+    Headers are probed first so every chunk can be aligned to the union of all
+    columns; columns a file lacks are left empty. Each row gets the name of its
+    source file, and the cleaning of the selected columns is applied after
+    alignment. ``progress(done, total)`` is called as each file is merged.
+    Returns False, removing the partial output, if cancelled.
+    """
+    columns = merged_columns(paths)
+    columns_to_clean = list(dict.fromkeys(columns_to_clean))
+    sink = open_sink(destination_file_path)
+    written = False
+    for done, path in enumerate(paths, 1):
+        for df in iter_chunks(path):
+            if cancelled is not None and cancelled():
+                if written and os.path.exists(destination_file_path):
+                    os.remove(destination_file_path)
+                return False
+            df = df.reindex(columns=columns)
+            df = clean_chunk(df, columns_to_clean, desired_value)
+            df.insert(0, SOURCE_COLUMN, os.path.basename(path))
+            sink.write(df)
+            written = True
+        if progress is not None:
+            progress(done, len(paths))
+    if not written:
+        sink.write(DataFrame(columns=[SOURCE_COLUMN] + columns))
+    sink.close()
+    return True
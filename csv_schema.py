@@ -0,0 +1,28 @@
+# Compact dtypes for the columns the tools know about. Radio metrics fit in
+# float32, coordinates keep float64 precision and Cell ID is stored as a
+# categorical, which also copes with missing values.
+RADIO_COLUMNS = ['R0 RSRP (0)', 'R0 RSRP (1)', 'SSB_RP (0)', 'SSB_RP (1)',
+                 'R0 RS CINR (0)', 'SSB_CINR (0)', 'RSSI (0)']
+COORDINATE_COLUMNS = ['Longitude', 'Latitude']
+CATEGORY_COLUMNS = ['Cell ID (0)']
+
+COLUMN_DTYPES = {}
+COLUMN_DTYPES.update({col: 'float32' for col in RADIO_COLUMNS})
+COLUMN_DTYPES.update({col: 'float64' for col in COORDINATE_COLUMNS})
+COLUMN_DTYPES.update({col: 'category' for col in CATEGORY_COLUMNS})
+
+
+def dtypes_for(columns=None):
+    """Return the registered dtypes of the given columns, or of all known columns."""
+    if columns is None:
+        return dict(COLUMN_DTYPES)
+    return {col: COLUMN_DTYPES[col] for col in columns if col in COLUMN_DTYPES}
+
+
+def arrow_types_for(columns=None):
+    """Return the registered dtypes as pyarrow types for the columnar conversion."""
+    import pyarrow as pa
+
+    arrow_types = {'float32': pa.float32(), 'float64': pa.float64(),
+                   'category': pa.dictionary(pa.int32(), pa.string())}
+    return {col: arrow_types[dtype] for col, dtype in dtypes_for(columns).items()}
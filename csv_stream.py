@@ -0,0 +1,45 @@
+import csv
+import pandas as pd
+from columnar_cache import ensure_columnar, iter_columnar_chunks
+from csv_schema import dtypes_for
+
+# Rows parsed per chunk; keeps memory flat no matter how big the file is
+CHUNK_ROWS = 250000
+
+
+def read_header(path):
+    """Return the column names from the first line of a CSV file.
+
+    Only the header line is read, so files can be matched against the columns
+    a tool needs before any parsing happens.
+    """
+    with open(path, newline='', encoding='utf-8-sig', errors='replace') as f:
+        return next(csv.reader(f), [])
+
+
+def iter_chunks(path, columns=None, chunksize=CHUNK_ROWS, columnar=False):
+    """Yield a CSV file in bounded-size chunks, parsing only the requested columns.
+
+    Requested columns that are missing from the file are ignored, and known
+    ones are parsed with the compact dtypes of the schema registry. ``None``
+    reads every column with pandas' own type inference, so cleaning and merging
+    keep values that do not fit a registered dtype. With ``columnar``,
+    projected reads come from a Feather copy of the file, which is rebuilt
+    whenever the CSV changes; whole-file reads always parse the CSV, since
+    Arrow's type inference would reformat values such as timestamps.
+    """
+    if columnar and columns is not None:
+        cache_path = ensure_columnar(path)
+        if cache_path is not None:
+            yield from iter_columnar_chunks(cache_path, columns)
+            return
+
+    usecols = None
+    dtype = None
+    if columns is not None:
+        wanted = set(columns)
+        usecols = lambda col: col in wanted
+        dtype = dtypes_for(columns)
+    with pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk
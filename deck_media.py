@@ -0,0 +1,225 @@
+import hashlib
+import io
+import math
+import posixpath
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from lxml import etree
+from deck_xml import A_NS, P_NS, PR_NS, R_NS
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Pixels per inch a picture needs at the size it is shown on the slide
+MEDIA_DPI = 150
+# Only downsample when the image is at least this much larger than needed
+DOWNSAMPLE_MARGIN = 1.25
+JPEG_QUALITY = 85
+EMU_PER_INCH = 914400
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+MEDIA_PREFIX = 'ppt/media/'
+
+
+class MediaPlan(namedtuple('MediaPlan', ['replaced', 'removed', 'downsampled', 'saved'])):
+    """Zip entries to rewrite and drop, with the number of images downsampled and bytes saved."""
+
+    def __bool__(self):
+        return bool(self.replaced or self.removed)
+
+    def describe(self):
+        return (f"merged {len(self.removed)} duplicate images, downsampled {self.downsampled}, "
+                f"saved {self.saved / 1048576:.1f} MB")
+
+
+def rels_source(rels_name):
+    """Return the folder of the part a relationships part belongs to."""
+    return posixpath.dirname(posixpath.dirname(rels_name))
+
+
+def resolve_target(rels_name, target):
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(rels_source(rels_name), target))
+
+
+def media_references(source, names):
+    """Map every relationships part to its ``{rId: media part}`` links."""
+    references = {}
+    for name in names:
+        if not name.endswith('.rels'):
+            continue
+        root = ET.fromstring(source.read(name))
+        links = {}
+        for rel in root.iter(f'{{{PR_NS}}}Relationship'):
+            if rel.get('TargetMode') == 'External':
+                continue
+            target = resolve_target(name, rel.get('Target'))
+            if target.startswith(MEDIA_PREFIX):
+                links[rel.get('Id')] = target
+        if links:
+            references[name] = links
+    return references
+
+
+def duplicate_media(source, names):
+    """Map each media part whose bytes repeat an earlier one to that first copy."""
+    first = {}
+    duplicates = {}
+    for name in sorted(n for n in names if n.startswith(MEDIA_PREFIX)):
+        digest = hashlib.blake2b()
+        with source.open(name) as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        key = digest.digest()
+        if key in first:
+            duplicates[name] = first[key]
+        else:
+            first[key] = name
+    return duplicates
+
+
+def slide_extents(data, links):
+    """Return the size each image of a slide is shown at, as ``{rId: (inches wide, inches high)}``.
+
+    An rId used anywhere other than the blip of a top-level picture maps to
+    None, since its displayed size is unknown.
+    """
+    root = ET.fromstring(data)
+    extents = {}
+    known = set()
+    tree = root.find(f'{{{P_NS}}}cSld/{{{P_NS}}}spTree')
+    if tree is not None:
+        for pic in tree.findall(f'{{{P_NS}}}pic'):
+            blip = pic.find(f'{{{P_NS}}}blipFill/{{{A_NS}}}blip')
+            ext = pic.find(f'{{{P_NS}}}spPr/{{{A_NS}}}xfrm/{{{A_NS}}}ext')
+            rid = blip.get(f'{{{R_NS}}}embed') if blip is not None else None
+            if rid is None or ext is None:
+                continue
+            crop = pic.find(f'{{{P_NS}}}blipFill/{{{A_NS}}}srcRect')
+            crop = {side: int(crop.get(side, 0)) / 100000 if crop is not None else 0.0 for side in 'ltrb'}
+            # A cropped picture shows only part of the image, so the whole image needs more pixels
+            visible_w = max(1 - crop['l'] - crop['r'], 0.01)
+            visible_h = max(1 - crop['t'] - crop['b'], 0.01)
+            need = (int(ext.get('cx')) / EMU_PER_INCH / visible_w, int(ext.get('cy')) / EMU_PER_INCH / visible_h)
+            previous = extents.get(rid, (0.0, 0.0))
+            if previous is not None:
+                extents[rid] = (max(previous[0], need[0]), max(previous[1], need[1]))
+            known.add(id(blip))
+    for element in root.iter():
+        for attribute in (f'{{{R_NS}}}embed', f'{{{R_NS}}}link'):
+            rid = element.get(attribute)
+            if rid in links and id(element) not in known:
+                extents[rid] = None
+    return extents
+
+
+def downsample(data, need_inches, dpi):
+    """Return smaller image bytes for the displayed size, or None if the image is left as is."""
+    if Image is None:
+        return None
+    with Image.open(io.BytesIO(data)) as image:
+        if image.format not in ('PNG', 'JPEG') or getattr(image, 'is_animated', False):
+            return None
+        scale = max(need_inches[0] * dpi / image.width, need_inches[1] * dpi / image.height)
+        if scale * DOWNSAMPLE_MARGIN > 1:
+            return None
+        size = (max(1, math.ceil(image.width * scale)), max(1, math.ceil(image.height * scale)))
+        resized = image.resize(size, Image.LANCZOS)
+        out = io.BytesIO()
+        if image.format == 'PNG':
+            resized.save(out, 'PNG', optimize=True)
+        else:
+            if resized.mode not in ('RGB', 'L', 'CMYK'):
+                resized = resized.convert('RGB')
+            resized.save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    data_out = out.getvalue()
+    return data_out if len(data_out) < len(data) else None
+
+
+def serialize(root):
+    """Write a rewritten package part back out with the prefixes and namespaces it was read with."""
+    return etree.tostring(root, encoding='UTF-8', xml_declaration=True, standalone=True)
+
+
+def rewrite_rels(data, rels_name, duplicates):
+    root = etree.fromstring(data)
+    changed = False
+    for rel in root.iter(f'{{{PR_NS}}}Relationship'):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = resolve_target(rels_name, rel.get('Target'))
+        if target in duplicates:
+            canonical = duplicates[target]
+            if rel.get('Target').startswith('/'):
+                rel.set('Target', '/' + canonical)
+            else:
+                rel.set('Target', posixpath.relpath(canonical, rels_source(rels_name)))
+            changed = True
+    if not changed:
+        return None
+    return serialize(root)
+
+
+def drop_overrides(data, removed):
+    root = etree.fromstring(data)
+    overrides = [o for o in root.findall(f'{{{CT_NS}}}Override') if o.get('PartName', '').lstrip('/') in removed]
+    for override in overrides:
+        root.remove(override)
+    return serialize(root) if overrides else None
+
+
+def plan_media(source, dpi=MEDIA_DPI, slides=None):
+    """Work out the entries to rewrite and drop to slim the media of an open deck.
+
+    Duplicate media parts are dropped and every relationship pointing at one
+    is redirected to the first copy. PNG and JPEG images larger than their
+    biggest on-slide size needs at ``dpi`` are resized (requires Pillow).
+    ``slides`` maps slide parts to XML that replaces them in the same write,
+    so pictures are sized as they will be saved. Nothing is written here; the
+    plan goes into the caller's single ``write_zip``.
+    """
+    slides = slides or {}
+    names = source.namelist()
+    references = media_references(source, names)
+    duplicates = duplicate_media(source, names)
+
+    replaced = {}
+    for rels_name in references:
+        data = rewrite_rels(source.read(rels_name), rels_name, duplicates)
+        if data is not None:
+            replaced[rels_name] = data
+    if duplicates and '[Content_Types].xml' in names:
+        data = drop_overrides(source.read('[Content_Types].xml'), set(duplicates))
+        if data is not None:
+            replaced['[Content_Types].xml'] = data
+
+    # Largest size each remaining image is shown at; None once any use has an unknown size
+    needs = {}
+    for rels_name, links in references.items():
+        part = posixpath.join(rels_source(rels_name), posixpath.basename(rels_name)[:-len('.rels')])
+        if part.startswith('ppt/slides/') and part in names:
+            extents = slide_extents(slides[part] if part in slides else source.read(part), links)
+        else:
+            extents = dict.fromkeys(links)
+        for rid, media in links.items():
+            media = duplicates.get(media, media)
+            need = extents.get(rid)
+            previous = needs.get(media, (0.0, 0.0))
+            if need is None or previous is None:
+                needs[media] = None
+            else:
+                needs[media] = (max(previous[0], need[0]), max(previous[1], need[1]))
+
+    saved = sum(source.getinfo(name).compress_size for name in duplicates)
+    downsampled = 0
+    for media, need in needs.items():
+        if need is None or media not in names:
+            continue
+        data = downsample(source.read(media), need, dpi)
+        if data is not None:
+            replaced[media] = data
+            saved += source.getinfo(media).compress_size - len(data)
+            downsampled += 1
+    return MediaPlan(replaced, set(duplicates), downsampled, saved)
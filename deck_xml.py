@@ -0,0 +1,385 @@
+import contextlib
+import io
+import os
+import posixpath
+import shutil
+import struct
+import tempfile
+import xml.etree.ElementTree as ET
+import xml.sax
+import zipfile
+import zlib
+from xml.sax.saxutils import XMLGenerator
+
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PR_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+SLIDE_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide'
+
+LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+END_RECORD = struct.Struct('<4s4H2LH')
+DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+COPY_BLOCK = 1024 * 1024
+
+# Children of <p:spPr> that come before <a:ln> in the schema
+SPPR_BEFORE_LN = ('xfrm', 'custGeom', 'prstGeom', 'noFill', 'solidFill', 'gradFill', 'blipFill', 'pattFill', 'grpFill')
+LN_FILLS = ('noFill', 'solidFill', 'gradFill', 'pattFill')
+
+
+class UnsupportedDeck(Exception):
+    """The deck uses a structure the direct XML editor does not handle."""
+
+
+class Node:
+    __slots__ = ('name', 'attrs', 'children')
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.children = []
+
+    def child(self, name):
+        for child in self.children:
+            if isinstance(child, Node) and child.name == name:
+                return child
+        return None
+
+
+class _Fill:
+    def __init__(self, line):
+        self.line = line
+        self.fore_color = self
+
+    def solid(self):
+        self.line.set_fill(None)
+
+    @property
+    def rgb(self):
+        return None
+
+    @rgb.setter
+    def rgb(self, value):
+        self.line.set_fill(str(value))
+
+
+class _Line:
+    """Stands in for ``shape.line`` on a raw <p:pic> element."""
+
+    def __init__(self, picture):
+        self.picture = picture
+        self.fill = _Fill(self)
+
+    def ln(self):
+        picture = self.picture
+        sppr = picture.sppr
+        ln = sppr.child(picture.a + 'ln')
+        if ln is None:
+            ln = Node(picture.a + 'ln', {})
+            picture.changed = True
+            index = 0
+            for i, child in enumerate(sppr.children):
+                if isinstance(child, Node) and child.name in [picture.a + name for name in SPPR_BEFORE_LN]:
+                    index = i + 1
+            sppr.children.insert(index, ln)
+        return ln
+
+    @property
+    def width(self):
+        ln = self.picture.sppr.child(self.picture.a + 'ln')
+        return int(ln.attrs.get('w', 0)) if ln is not None else 0
+
+    @width.setter
+    def width(self, value):
+        self.picture.set(self.ln(), 'w', value)
+
+    def set_fill(self, rgb):
+        picture = self.picture
+        a = picture.a
+        ln = self.ln()
+        fill = ln.child(a + 'solidFill')
+        children = [child for child in ln.children
+                    if not (isinstance(child, Node) and child.name in [a + name for name in LN_FILLS] and child is not fill)]
+        if len(children) != len(ln.children):
+            ln.children = children
+            picture.changed = True
+        if fill is None:
+            fill = Node(a + 'solidFill', {})
+            ln.children.insert(0, fill)
+            picture.changed = True
+        if rgb is not None:
+            colors = [child for child in fill.children if isinstance(child, Node)]
+            if not (len(colors) == 1 and colors[0].name == a + 'srgbClr' and colors[0].attrs.get('val') == rgb
+                    and not colors[0].children):
+                fill.children = [Node(a + 'srgbClr', {'val': rgb})]
+                picture.changed = True
+
+
+class PictureXml:
+    """Stands in for a python-pptx picture shape, so the same transforms edit raw slide XML."""
+
+    def __init__(self, node, p, a):
+        self.node = node
+        self.a = a
+        self.sppr = node.child(p + 'spPr')
+        xfrm = self.sppr.child(a + 'xfrm') if self.sppr is not None else None
+        self.off = xfrm.child(a + 'off') if xfrm is not None else None
+        self.ext = xfrm.child(a + 'ext') if xfrm is not None else None
+        if self.off is None or self.ext is None:
+            raise UnsupportedDeck("picture without a position")
+        self.line = _Line(self)
+        self.changed = False
+
+    def set(self, node, key, value):
+        """Set an EMU attribute, noting whether the picture actually changed."""
+        value = str(int(value))
+        if node.attrs.get(key) != value:
+            node.attrs[key] = value
+            self.changed = True
+
+    left = property(lambda self: int(self.off.attrs['x']), lambda self, v: self.set(self.off, 'x', v))
+    top = property(lambda self: int(self.off.attrs['y']), lambda self, v: self.set(self.off, 'y', v))
+    width = property(lambda self: int(self.ext.attrs['cx']), lambda self, v: self.set(self.ext, 'cx', v))
+    height = property(lambda self: int(self.ext.attrs['cy']), lambda self, v: self.set(self.ext, 'cy', v))
+
+
+class SlideSize:
+    def __init__(self, slide_width, slide_height):
+        self.slide_width = slide_width
+        self.slide_height = slide_height
+
+
+class SlideRewriter(XMLGenerator):
+    """Pass a slide through unchanged except for its top-level pictures, which are transformed.
+
+    Only each <p:pic> subtree is held in memory; the rest of the slide is
+    written out as it is parsed.
+    """
+
+    def __init__(self, out, transforms, size):
+        super().__init__(out, 'UTF-8', short_empty_elements=True)
+        self.transforms = transforms
+        self.size = size
+        self.stack = []
+        self.buffer = None
+        self.p = self.a = None
+        self.pictures = 0
+        self.changed = False
+
+    def startDocument(self):
+        self._write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n')
+
+    def startElement(self, name, attrs):
+        attrs = dict(attrs.items())
+        if not self.stack:
+            prefixes = {uri: key[6:] for key, uri in attrs.items() if key.startswith('xmlns:')}
+            if P_NS not in prefixes or A_NS not in prefixes:
+                raise UnsupportedDeck("unexpected namespace prefixes")
+            self.p, self.a = prefixes[P_NS] + ':', prefixes[A_NS] + ':'
+        if self.buffer is not None:
+            node = Node(name, attrs)
+            self.buffer[-1].children.append(node)
+            self.buffer.append(node)
+        elif name == self.p + 'pic' and self.stack and self.stack[-1] == self.p + 'spTree':
+            self.buffer = [Node(name, attrs)]
+        else:
+            super().startElement(name, attrs)
+        self.stack.append(name)
+
+    def endElement(self, name):
+        self.stack.pop()
+        if self.buffer is None:
+            super().endElement(name)
+            return
+        node = self.buffer.pop()
+        if not self.buffer:
+            self.buffer = None
+            self.transform(node)
+            self.emit(node)
+
+    def characters(self, content):
+        if self.buffer is not None:
+            self.buffer[-1].children.append(content)
+        else:
+            super().characters(content)
+
+    def ignorableWhitespace(self, content):
+        self.characters(content)
+
+    def transform(self, node):
+        nvpr = node.child(self.p + 'nvPicPr')
+        nvpr = nvpr.child(self.p + 'nvPr') if nvpr is not None else None
+        if nvpr is not None and (nvpr.child(self.p + 'ph') is not None or nvpr.child(self.a + 'videoFile') is not None):
+            # Placeholder pictures and movies are not MSO_SHAPE_TYPE.PICTURE shapes, so they are left alone
+            return
+        picture = PictureXml(node, self.p, self.a)
+        for transform in self.transforms:
+            transform(picture, self.size)
+        self.pictures += 1
+        self.changed = self.changed or picture.changed
+
+    def emit(self, node):
+        super().startElement(node.name, node.attrs)
+        for child in node.children:
+            if isinstance(child, Node):
+                self.emit(child)
+            else:
+                super().characters(child)
+        super().endElement(node.name)
+
+
+def rewrite_slide(data, transforms, size):
+    """Return the slide XML with the transforms applied to its pictures, or None if nothing changed."""
+    out = io.BytesIO()
+    rewriter = SlideRewriter(out, transforms, size)
+    parser = xml.sax.make_parser()
+    parser.setFeature(xml.sax.handler.feature_namespaces, False)
+    parser.setFeature(xml.sax.handler.feature_external_ges, False)
+    parser.setContentHandler(rewriter)
+    parser.parse(io.BytesIO(data))
+    return out.getvalue() if rewriter.changed else None
+
+
+def slide_parts(source):
+    """Return the slide part names of a deck in presentation order, and the slide size."""
+    presentation = ET.fromstring(source.read('ppt/presentation.xml'))
+    size = presentation.find(f'{{{P_NS}}}sldSz')
+    if size is None:
+        raise UnsupportedDeck("no slide size")
+    rels = ET.fromstring(source.read('ppt/_rels/presentation.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(f'{{{PR_NS}}}Relationship')
+               if rel.get('Type') == SLIDE_TYPE and rel.get('TargetMode') != 'External'}
+    parts = []
+    for slide_id in presentation.iter(f'{{{P_NS}}}sldId'):
+        target = targets.get(slide_id.get(f'{{{R_NS}}}id'))
+        if target is not None:
+            parts.append(target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('ppt', target)))
+    return parts, SlideSize(int(size.get('cx')), int(size.get('cy')))
+
+
+def central_directory(f):
+    """Return the raw central directory records of a zip file and its end record."""
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    tail_size = min(file_size, END_RECORD.size + 65535)
+    f.seek(file_size - tail_size)
+    tail = f.read()
+    position = tail.rfind(b'PK\x05\x06')
+    if position < 0:
+        raise zipfile.BadZipFile("end of central directory not found")
+    end = END_RECORD.unpack_from(tail, position)
+    comment = tail[position + END_RECORD.size:position + END_RECORD.size + end[7]]
+    count, size, offset = end[4], end[5], end[6]
+    if count == 0xFFFF or offset == 0xFFFFFFFF:
+        raise UnsupportedDeck("zip64 archive")
+    f.seek(offset)
+    data = f.read(size)
+    records = []
+    position = 0
+    for _ in range(count):
+        header = list(CENTRAL_HEADER.unpack_from(data, position))
+        length = CENTRAL_HEADER.size + header[10] + header[11] + header[12]
+        name = data[position + CENTRAL_HEADER.size:position + CENTRAL_HEADER.size + header[10]]
+        records.append((header, data[position + CENTRAL_HEADER.size:position + length], name))
+        position += length
+    return records, comment
+
+
+def copy_entry(f, out, header):
+    """Copy one entry's local header, compressed data and data descriptor without recompressing."""
+    f.seek(header[16])
+    local = f.read(LOCAL_HEADER.size)
+    fields = LOCAL_HEADER.unpack(local)
+    remaining = fields[9] + fields[10] + header[8]
+    out.write(local)
+    while remaining:
+        block = f.read(min(COPY_BLOCK, remaining))
+        if not block:
+            raise zipfile.BadZipFile("truncated entry")
+        out.write(block)
+        remaining -= len(block)
+    if header[3] & 0x08:
+        signature = f.read(4)
+        out.write(signature + f.read(12 if signature == DESCRIPTOR_SIGNATURE else 8))
+
+
+def write_entry(f, out, header, data):
+    """Write an entry with new contents, keeping the name and extra field of its local header.
+
+    Entries that were stored stay stored; everything else is deflated.
+    """
+    f.seek(header[16])
+    fields = list(LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size)))
+    name_extra = f.read(fields[9] + fields[10])
+    method = zipfile.ZIP_STORED if header[4] == zipfile.ZIP_STORED else zipfile.ZIP_DEFLATED
+    if method == zipfile.ZIP_STORED:
+        compressed = data
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+    crc = zlib.crc32(data)
+    fields[2] &= ~0x08
+    fields[3] = method
+    fields[6], fields[7], fields[8] = crc, len(compressed), len(data)
+    out.write(LOCAL_HEADER.pack(*fields) + name_extra + compressed)
+    header[3] &= ~0x08
+    header[4] = method
+    header[7], header[8], header[9] = crc, len(compressed), len(data)
+
+
+def write_zip(pptx_path, replaced, removed=(), output_path=None, source=None):
+    """Rewrite a zip with some entries replaced or removed, copying every other entry raw.
+
+    The result replaces the original through a temp file unless
+    ``output_path`` is given, and keeps the permissions of the original.
+    Entries are read from the open binary file ``source`` instead of the
+    original when one is given, e.g. a deck python-pptx saved to memory.
+    """
+    with open(pptx_path, 'rb') if source is None else contextlib.nullcontext(source) as f:
+        records, comment = central_directory(f)
+        target = output_path or pptx_path
+        fd, temp_path = tempfile.mkstemp(suffix='.pptx', dir=os.path.dirname(os.path.abspath(target)))
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                central = []
+                for header, name_extra_comment, name in records:
+                    part = name.decode('utf-8' if header[3] & 0x800 else 'cp437')
+                    if part in removed:
+                        continue
+                    offset = out.tell()
+                    if part in replaced:
+                        write_entry(f, out, header, replaced[part])
+                    else:
+                        copy_entry(f, out, header)
+                    if offset > 0xFFFFFFFF:
+                        raise UnsupportedDeck("output needs zip64")
+                    header[16] = offset
+                    central.append(CENTRAL_HEADER.pack(*header) + name_extra_comment)
+                central_offset = out.tell()
+                central_data = b''.join(central)
+                out.write(central_data)
+                out.write(END_RECORD.pack(b'PK\x05\x06', 0, 0, len(central), len(central), len(central_data),
+                                          central_offset, len(comment)) + comment)
+            # mkstemp creates the file private to the owner
+            shutil.copymode(pptx_path, temp_path)
+            os.replace(temp_path, target)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+def rewrite_slides(source, transforms):
+    """Apply picture transforms to the slide XML of an open deck.
+
+    Returns ``{slide part: new XML}`` for the slides that changed, ready for
+    ``write_zip``; every other entry, media included, can then be copied byte
+    for byte. Raises UnsupportedDeck for decks this editor cannot handle.
+    """
+    parts, size = slide_parts(source)
+    rewritten = {}
+    for part in parts:
+        data = rewrite_slide(source.read(part), transforms, size)
+        if data is not None:
+            rewritten[part] = data
+    return rewritten
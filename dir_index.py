@@ -0,0 +1,189 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+EntryInfo = namedtuple('EntryInfo', ['name', 'is_dir', 'size', 'mtime_ns'])
+
+# inotify flags from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+# Without inotify a directory is rescanned when its mtime changes, and always
+# while that mtime is this recent, since coarse timestamps can hide a change
+MTIME_SETTLE_NS = 2 * 10**9
+
+_lock = threading.RLock()
+_indexes = {}
+
+
+class _Inotify:
+    """One inotify instance shared by every directory index of the process."""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+
+    def add_watch(self, index):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(index.path), WATCH_MASK)
+        if wd < 0:
+            return False
+        self.watches[wd] = index
+        return True
+
+    def remove_watch(self, index):
+        for wd, watched in list(self.watches.items()):
+            if watched is index:
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+
+    def dispatch(self):
+        """Apply every queued event to the index it belongs to."""
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were lost: every index has to be rebuilt from disk
+                    for index in self.watches.values():
+                        index.stale = True
+                    continue
+                index = self.watches.get(wd)
+                if index is None:
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    index.stale = True
+                    index.watched = False
+                    self.watches.pop(wd, None)
+                elif name:
+                    index.update_entry(os.fsdecode(name))
+
+
+def _make_inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return _Inotify()
+    except (OSError, AttributeError):
+        return None
+
+
+_inotify = _make_inotify()
+
+
+def _entry_info(entry):
+    stat = entry.stat()
+    return EntryInfo(entry.name, entry.is_dir(), stat.st_size, stat.st_mtime_ns)
+
+
+class DirectoryIndex:
+    """Cached listing of one directory with the stat data of its entries.
+
+    The listing is built with one os.scandir and then kept current from
+    inotify events on Linux; elsewhere it is rebuilt when the directory's
+    modification time changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.stale = True
+        self.watched = False
+        self.dir_mtime_ns = None
+
+    def rescan(self):
+        with _lock:
+            if _inotify is not None and not self.watched:
+                self.watched = _inotify.add_watch(self)
+            entries = {}
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    try:
+                        entries[entry.name] = _entry_info(entry)
+                    except OSError:
+                        continue
+            self.entries = entries
+            self.dir_mtime_ns = os.stat(self.path).st_mtime_ns
+            self.stale = False
+
+    def update_entry(self, name):
+        """Re-stat one entry after an event, dropping it if it is gone."""
+        path = os.path.join(self.path, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.entries.pop(name, None)
+            return
+        self.entries[name] = EntryInfo(name, os.path.isdir(path), stat.st_size, stat.st_mtime_ns)
+
+    def refresh(self):
+        """Bring the listing up to date, rescanning only when events cannot."""
+        with _lock:
+            if self.watched and _inotify is not None:
+                _inotify.dispatch()
+                if not self.stale:
+                    return
+            elif not self.stale:
+                mtime_ns = os.stat(self.path).st_mtime_ns
+                if mtime_ns == self.dir_mtime_ns and time.time_ns() - mtime_ns > MTIME_SETTLE_NS:
+                    return
+            self.rescan()
+
+    def files(self, extensions=None):
+        """Return the names of the files in the directory, sorted, optionally by extension."""
+        with _lock:
+            self.refresh()
+            entries = list(self.entries.values())
+        return sorted(info.name for info in entries
+                      if not info.is_dir and (extensions is None or info.name.endswith(tuple(extensions))))
+
+    def dirs(self):
+        """Return the names of the subdirectories, sorted."""
+        with _lock:
+            self.refresh()
+            entries = list(self.entries.values())
+        return sorted(info.name for info in entries if info.is_dir)
+
+    def close(self):
+        with _lock:
+            if _inotify is not None:
+                _inotify.remove_watch(self)
+            self.watched = False
+            self.stale = True
+
+
+def get_index(path):
+    """Return the shared index of a directory, creating it on first use."""
+    key = os.path.abspath(path)
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = DirectoryIndex(key)
+        return index
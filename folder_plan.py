@@ -0,0 +1,139 @@
+import json
+import os
+import re
+
+JOURNAL_FILE = '.distribution_journal'
+# Completed moves are checkpointed to the journal every this many renames
+CHECKPOINT_EVERY = 1000
+
+NUMBER_PATTERN = re.compile(r'\d+')
+
+
+def natural_key(name):
+    """Sort by the first number in the name, then by the name itself."""
+    match = NUMBER_PATTERN.search(name)
+    return (int(match.group()) if match else 0, name)
+
+
+def journal_path(source_dir):
+    return os.path.join(source_dir, JOURNAL_FILE)
+
+
+def plan_distribution(source_dir, folder_names, num_files_per_folder, extension='.csv'):
+    """Plan how the files of a directory are spread over folders, a fixed number per folder in turn.
+
+    Reads the directory with a single scandir and returns ``(folders, moves)``:
+    the folders that have to be created and the ``(file_name, folder_name)``
+    moves in order.
+    """
+    if num_files_per_folder < 1:
+        raise ValueError("Number of files per folder must be at least 1.")
+    folder_names = [name.strip() for name in folder_names if name.strip()]
+    if not folder_names:
+        raise ValueError("No folder names given.")
+
+    files = []
+    existing_dirs = set()
+    with os.scandir(source_dir) as it:
+        for entry in it:
+            if entry.is_dir():
+                existing_dirs.add(entry.name)
+            elif entry.name.endswith(extension):
+                files.append(entry.name)
+    files.sort(key=natural_key)
+
+    num_folders = len(folder_names)
+    moves = [(name, folder_names[(i // num_files_per_folder) % num_folders]) for i, name in enumerate(files)]
+    used = {folder for _, folder in moves}
+    folders = [name for name in dict.fromkeys(folder_names) if name in used and name not in existing_dirs]
+    return folders, moves
+
+
+def write_journal(source_dir, folders, moves):
+    with open(journal_path(source_dir), 'w', encoding='utf-8') as journal:
+        journal.write(json.dumps({'folders': folders, 'moves': moves}) + '\n')
+        journal.flush()
+        os.fsync(journal.fileno())
+
+
+def read_journal(source_dir):
+    """Return ``(folders, moves, done)`` from an unfinished distribution, or None if there is none."""
+    try:
+        with open(journal_path(source_dir), encoding='utf-8') as journal:
+            plan = json.loads(journal.readline())
+            done = 0
+            for line in journal:
+                try:
+                    done = json.loads(line)['done']
+                except (ValueError, KeyError):
+                    # A checkpoint cut short by a crash; the previous one still holds
+                    break
+    except FileNotFoundError:
+        return None
+    return plan['folders'], [tuple(move) for move in plan['moves']], done
+
+
+def apply_plan(source_dir, folders, moves, start=0, log=print, progress=None, cancelled=None):
+    """Create the planned folders and run the moves, checkpointing progress to the journal.
+
+    ``progress(done, total)`` is called after every move.
+
+    Returns True when every move is done; on cancellation the journal is
+    left in place so the distribution can be resumed or rolled back.
+    """
+    for folder in folders:
+        os.makedirs(os.path.join(source_dir, folder), exist_ok=True)
+
+    counts = {}
+    with open(journal_path(source_dir), 'a', encoding='utf-8') as journal:
+        for index in range(start, len(moves)):
+            if index % CHECKPOINT_EVERY == 0:
+                journal.write(json.dumps({'done': index}) + '\n')
+                journal.flush()
+                if cancelled is not None and cancelled():
+                    log(f"Moving CSV files cancelled after {index} of {len(moves)} files.")
+                    return False
+            file_name, folder = moves[index]
+            destination = os.path.join(source_dir, folder, file_name)
+            try:
+                os.rename(os.path.join(source_dir, file_name), destination)
+            except FileNotFoundError:
+                # Moved before a crash, after the last checkpoint
+                if not os.path.exists(destination):
+                    raise
+            counts[folder] = counts.get(folder, 0) + 1
+            if progress is not None:
+                progress(index + 1, len(moves))
+
+    for folder, count in counts.items():
+        log(f"Moved {count} CSV files to folder '{folder}'")
+    os.remove(journal_path(source_dir))
+    return True
+
+
+def rollback_plan(source_dir, folders, moves, done, log=print, progress=None):
+    """Move the files of an unfinished distribution back and remove the folders it created."""
+    restored = 0
+    last = min(len(moves), done + CHECKPOINT_EVERY)
+    # Moves past the last checkpoint may or may not have happened, so those are checked one by one
+    for index in range(last - 1, -1, -1):
+        if progress is not None:
+            progress(last - index, last)
+        file_name, folder = moves[index]
+        source = os.path.join(source_dir, file_name)
+        destination = os.path.join(source_dir, folder, file_name)
+        if index >= done and (os.path.exists(source) or not os.path.exists(destination)):
+            continue
+        try:
+            os.rename(destination, source)
+            restored += 1
+        except FileNotFoundError:
+            pass
+
+    for folder in folders:
+        try:
+            os.rmdir(os.path.join(source_dir, folder))
+        except OSError:
+            pass
+    os.remove(journal_path(source_dir))
+    log(f"Rolled back {restored} moved CSV files.")
@@ -0,0 +1,186 @@
+import csv
+import json
+import numpy as np
+from csv_stream import read_header, iter_chunks
+from kpi_engine import column_values, find_csv_files, index_headers, has_kpi_columns, run_tasks
+
+LONGITUDE = 'Longitude'
+LATITUDE = 'Latitude'
+
+# Bin sizes offered in the GUI, in metres
+GRID_SIZES = [25, 50, 100]
+
+# Length of one degree of latitude; longitude steps are widened by 1/cos(latitude)
+METERS_PER_DEGREE = 111320.0
+
+# How each per-bin field combines when bins are merged
+REDUCERS = {
+    'count': np.add,
+    'RSRP_sum': np.add, 'RSRP_min': np.fmin, 'RSRP_max': np.fmax, 'RSRP_pass': np.add,
+    'CINR_sum': np.add, 'CINR_min': np.fmin, 'CINR_max': np.fmax, 'CINR_pass': np.add,
+}
+
+
+def bin_index(lon, lat, bin_size):
+    """Snap coordinates to grid cells of roughly ``bin_size`` metres on each side."""
+    lat_step = bin_size / METERS_PER_DEGREE
+    iy = np.floor(lat / lat_step).astype(np.int64)
+    lon_step = lat_step / np.cos(np.radians((iy + 0.5) * lat_step))
+    ix = np.floor(lon / lon_step).astype(np.int64)
+    return ix, iy
+
+
+def bin_bounds(ix, iy, bin_size):
+    """Return the west, south, east and north edges of grid cells."""
+    lat_step = bin_size / METERS_PER_DEGREE
+    lon_step = lat_step / np.cos(np.radians((iy + 0.5) * lat_step))
+    return ix * lon_step, iy * lat_step, (ix + 1) * lon_step, (iy + 1) * lat_step
+
+
+def empty_grid():
+    """Return a grid without any bins."""
+    grid = {'ix': np.empty(0, dtype=np.int64), 'iy': np.empty(0, dtype=np.int64)}
+    for field in REDUCERS:
+        grid[field] = np.empty(0, dtype=np.float64)
+    return grid
+
+
+def reduce_grid(grid):
+    """Combine entries that fall into the same cell, using sorting instead of per-row Python."""
+    if len(grid['ix']) == 0:
+        return grid
+    order = np.lexsort((grid['iy'], grid['ix']))
+    ix = grid['ix'][order]
+    iy = grid['iy'][order]
+    starts = np.flatnonzero(np.r_[True, (ix[1:] != ix[:-1]) | (iy[1:] != iy[:-1])])
+    reduced = {'ix': ix[starts], 'iy': iy[starts]}
+    for field, reducer in REDUCERS.items():
+        reduced[field] = reducer.reduceat(grid[field][order], starts)
+    return reduced
+
+
+def merge_grids(first, second):
+    """Merge two grids into one."""
+    return reduce_grid({field: np.concatenate([first[field], second[field]]) for field in first})
+
+
+def grid_chunk(frame, RSRP_cols, CINR_cols, RSRP_conditions, CINR_conditions, bin_size):
+    """Aggregate one chunk of samples into grid cells.
+
+    The best RSRP and CINR of each row are used, and a row passes a threshold
+    when any selected column reaches it, as in the per-file KPI.
+    """
+    lon = column_values(frame, LONGITUDE).astype(np.float64)
+    lat = column_values(frame, LATITUDE).astype(np.float64)
+    RSRP_values = [column_values(frame, col) for col in RSRP_cols]
+    CINR_values = [column_values(frame, col) for col in CINR_cols]
+
+    valid = ~np.isnan(lon) & ~np.isnan(lat)
+    for values in RSRP_values + CINR_values:
+        valid &= ~np.isnan(values)
+
+    ix, iy = bin_index(lon[valid], lat[valid], bin_size)
+    grid = {'ix': ix, 'iy': iy, 'count': np.ones(len(ix), dtype=np.float64)}
+    for key, values, conditions in (('RSRP', RSRP_values, RSRP_conditions), ('CINR', CINR_values, CINR_conditions)):
+        if values:
+            best = np.maximum.reduce(values)[valid].astype(np.float64)
+        else:
+            best = np.full(len(ix), np.nan)
+        grid[f'{key}_sum'] = best
+        grid[f'{key}_min'] = best
+        grid[f'{key}_max'] = best
+        grid[f'{key}_pass'] = (best >= conditions).astype(np.float64) if conditions is not None else np.zeros(len(ix))
+    return reduce_grid(grid)
+
+
+def grid_file(path, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, bin_size, header=None,
+              columnar=False):
+    """Aggregate one CSV file into grid cells, or None if it has no coordinates or KPI columns."""
+    if header is None:
+        header = read_header(path)
+    if LONGITUDE not in header or LATITUDE not in header:
+        return None
+    if not has_kpi_columns(header, RSRP_columns, CINR_columns):
+        return None
+
+    RSRP_cols = [col for col in RSRP_columns if col and col in header]
+    CINR_cols = [col for col in CINR_columns if col and col in header]
+    grid = empty_grid()
+    for chunk in iter_chunks(path, [LONGITUDE, LATITUDE] + RSRP_cols + CINR_cols, columnar=columnar):
+        grid = merge_grids(grid, grid_chunk(chunk, RSRP_cols, CINR_cols, RSRP_conditions, CINR_conditions, bin_size))
+    return grid
+
+
+def grid_directory(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, bin_size,
+                   workers=None, progress=None, columnar=False):
+    """Aggregate every CSV under a directory into one campaign grid.
+
+    Returns the merged grid and one warning per file that could not be processed.
+    """
+    header_index, warnings = index_headers(find_csv_files(directory))
+    tasks = [(path, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, bin_size, header, columnar)
+             for path, header in header_index.items()
+             if LONGITUDE in header and LATITUDE in header and has_kpi_columns(header, RSRP_columns, CINR_columns)]
+
+    grid = empty_grid()
+    for grid_part, error in run_tasks(grid_file, tasks, workers, progress):
+        if error is not None:
+            warnings.append(error)
+        elif grid_part is not None:
+            grid = merge_grids(grid, grid_part)
+    return grid, warnings
+
+
+def grid_rows(grid, bin_size):
+    """Yield one output row per grid cell."""
+    west, south, east, north = bin_bounds(grid['ix'], grid['iy'], bin_size)
+    count = grid['count']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        columns = {
+            'Longitude': (west + east) / 2,
+            'Latitude': (south + north) / 2,
+            'Samples': count.astype(np.int64),
+            'RSRP Mean': grid['RSRP_sum'] / count,
+            'RSRP Min': grid['RSRP_min'],
+            'RSRP Max': grid['RSRP_max'],
+            'RSRP Pass (%)': grid['RSRP_pass'] / count * 100,
+            'CINR Mean': grid['CINR_sum'] / count,
+            'CINR Min': grid['CINR_min'],
+            'CINR Max': grid['CINR_max'],
+            'CINR Pass (%)': grid['CINR_pass'] / count * 100,
+        }
+    for i in range(len(count)):
+        row = {}
+        for name, values in columns.items():
+            value = values[i].item()
+            row[name] = round(value, 2) if isinstance(value, float) and name not in (LONGITUDE, LATITUDE) else value
+        yield row
+
+
+def export_csv(output_file, grid, bin_size):
+    """Write the grid as a CSV table with one row per cell."""
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = None
+        for row in grid_rows(grid, bin_size):
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow(row)
+
+
+def export_geojson(output_file, grid, bin_size):
+    """Write the grid as a GeoJSON FeatureCollection of cell polygons, one feature at a time."""
+    west, south, east, north = bin_bounds(grid['ix'], grid['iy'], bin_size)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for i, row in enumerate(grid_rows(grid, bin_size)):
+            w, s, e, n = west[i].item(), south[i].item(), east[i].item(), north[i].item()
+            properties = {key: (None if isinstance(value, float) and value != value else value)
+                          for key, value in row.items()}
+            feature = {
+                'type': 'Feature',
+                'geometry': {'type': 'Polygon', 'coordinates': [[[w, s], [e, s], [e, n], [w, n], [w, s]]]},
+                'properties': properties,
+            }
+            f.write((',\n' if i else '') + json.dumps(feature))
+        f.write('\n]}\n')
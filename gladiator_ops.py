@@ -0,0 +1,177 @@
+import itertools
+import os
+from csv_cleaning import clean_file
+from fast_copy import copy_file
+from csv_merge import merge_csv_files
+from clean_pipeline import PIPELINE_DEPTH, CleaningPipeline
+from dir_index import get_index
+from folder_plan import NUMBER_PATTERN, apply_plan, plan_distribution, read_journal, rollback_plan, write_journal
+
+
+def extract_number(filename):
+    match = NUMBER_PATTERN.search(filename)
+    return int(match.group()) if match else 0
+
+
+def copy_folder(folder_path, folder_name, destination_folder, file_extension, columns_to_clean, desired_value,
+                manifest=None, log=print, progress=None, cancelled=None):
+    """Copy and clean the single CSV of one source folder into the destination folder.
+
+    With a sync manifest, destinations already written from the current source
+    with the same cleaning settings are skipped.
+    """
+    try:
+        csv_files = get_index(folder_path).files(['.csv'])
+        if len(csv_files) == 1:
+            csv_file_path = os.path.join(folder_path, csv_files[0])
+            new_file_name = f"{folder_name}_data{file_extension}"
+            destination_file_path = os.path.join(destination_folder, new_file_name)
+            settings = [columns_to_clean, desired_value]
+            if manifest is not None and manifest.is_current(csv_file_path, destination_file_path, settings):
+                log(f"File '{new_file_name}' is up to date, skipped.")
+                return
+            if not columns_to_clean and file_extension == '.csv':
+                # Nothing to transform: copy the bytes as they are instead of re-serialising them
+                copy_file(csv_file_path, destination_file_path)
+                log(f"File '{csv_file_path}' copied without changes, then saved as '{new_file_name}'.")
+            elif clean_file(csv_file_path, destination_file_path, columns_to_clean, desired_value, cancelled):
+                log(f"File '{csv_file_path}' copied and cleaned values for selected columns, then saved as '{new_file_name}'.")
+            else:
+                return
+            if manifest is not None:
+                manifest.record(csv_file_path, destination_file_path, settings)
+            if progress is not None:
+                progress(1, 1)
+    except Exception as e:
+        log(f"An error occurred while copying and cleaning CSV files: {e}")
+
+
+def copy_folders(folders, destination_folder, file_extension, columns_to_clean, desired_value, manifest=None,
+                 depth=PIPELINE_DEPTH, log=print, progress=None, cancelled=None):
+    """Copy and clean the single CSV of each ``(folder_path, folder_name)`` through one pipeline.
+
+    Reading the next folders' files overlaps with cleaning and writing the
+    current ones; the throughput of each stage is logged at the end.
+    """
+    settings = [columns_to_clean, desired_value]
+    jobs = []
+    finished = [0]
+
+    def advance():
+        finished[0] += 1
+        if progress is not None:
+            progress(finished[0], len(folders))
+
+    for folder_path, folder_name in folders:
+        if cancelled is not None and cancelled():
+            return
+        try:
+            csv_files = get_index(folder_path).files(['.csv'])
+            if len(csv_files) != 1:
+                advance()
+                continue
+            csv_file_path = os.path.join(folder_path, csv_files[0])
+            new_file_name = f"{folder_name}_data{file_extension}"
+            destination_file_path = os.path.join(destination_folder, new_file_name)
+            if manifest is not None and manifest.is_current(csv_file_path, destination_file_path, settings):
+                log(f"File '{new_file_name}' is up to date, skipped.")
+                advance()
+                continue
+            if not columns_to_clean and file_extension == '.csv':
+                copy_file(csv_file_path, destination_file_path)
+                log(f"File '{csv_file_path}' copied without changes, then saved as '{new_file_name}'.")
+                if manifest is not None:
+                    manifest.record(csv_file_path, destination_file_path, settings)
+                advance()
+                continue
+            jobs.append((csv_file_path, destination_file_path))
+        except Exception as e:
+            log(f"An error occurred while copying and cleaning CSV files: {e}")
+            advance()
+    if not jobs:
+        return
+
+    def done(source, destination, error):
+        advance()
+        if error is not None:
+            log(f"An error occurred while copying and cleaning '{source}': {error}")
+            return
+        log(f"File '{source}' copied and cleaned values for selected columns, then saved as '{os.path.basename(destination)}'.")
+        if manifest is not None:
+            manifest.record(source, destination, settings)
+
+    pipeline = CleaningPipeline(columns_to_clean, desired_value, depth, cancelled)
+    pipeline.run(jobs, done)
+    for stats in pipeline.stats:
+        log(stats.summary())
+
+
+def merge_folder(folder_path, destination_file_path, columns_to_clean, desired_value, log=print, progress=None,
+                 cancelled=None):
+    """Merge every CSV of one folder into a single cleaned output file."""
+    try:
+        csv_files = get_index(folder_path).files(['.csv'])
+        if not csv_files:
+            log(f"No CSV files found in '{folder_path}'.")
+            return
+        csv_files.sort(key=extract_number)
+        paths = [os.path.join(folder_path, f) for f in csv_files]
+        if merge_csv_files(paths, destination_file_path, columns_to_clean, desired_value, cancelled, progress):
+            log(f"Merged {len(paths)} CSV files from '{folder_path}' into '{os.path.basename(destination_file_path)}'.")
+    except Exception as e:
+        log(f"An error occurred while merging CSV files: {e}")
+
+
+def move_files_to_folders(source_dir, folder_names, num_files_per_folder, log=print, progress=None, cancelled=None):
+    """Distribute the CSV files of a directory over folders, a fixed number per folder in turn.
+
+    Every move is planned from one directory scan and written to a journal
+    before the first rename, so an interrupted run can be resumed or rolled back.
+    """
+    try:
+        folders, moves = plan_distribution(source_dir, folder_names, num_files_per_folder)
+        write_journal(source_dir, folders, moves)
+        if apply_plan(source_dir, folders, moves, log=log, progress=progress, cancelled=cancelled):
+            log("CSV files moved to folders successfully!")
+    except Exception as e:
+        log(f"An error occurred: {e}")
+
+
+def resume_distribution(source_dir, log=print, progress=None, cancelled=None):
+    """Finish an interrupted distribution from its journal."""
+    try:
+        folders, moves, done = read_journal(source_dir)
+        if apply_plan(source_dir, folders, moves, start=done, log=log, progress=progress, cancelled=cancelled):
+            log("CSV files moved to folders successfully!")
+    except Exception as e:
+        log(f"An error occurred: {e}")
+
+
+def rollback_distribution(source_dir, log=print, progress=None, cancelled=None):
+    """Undo an interrupted distribution from its journal."""
+    try:
+        rollback_plan(source_dir, *read_journal(source_dir), log=log, progress=progress)
+    except Exception as e:
+        log(f"An error occurred: {e}")
+
+
+def rename_files_in_folder(source_folder, folder_name, desired_names, file_extension, log=print, progress=None,
+                           cancelled=None):
+    """Rename the CSV files of one folder to the desired names, prefixed with the folder name."""
+    desired_names_cycle = itertools.cycle(desired_names)
+
+    csv_files = get_index(source_folder).files(['.csv'])
+    for done, file_name in enumerate(csv_files, 1):
+        if cancelled is not None and cancelled():
+            return
+        desired_name = next(desired_names_cycle)
+        new_file_name = f"{folder_name}_{desired_name}{file_extension}"  # Prepend the folder name to the desired name
+        old_file_path = os.path.join(source_folder, file_name)
+        new_file_path = os.path.join(source_folder, new_file_name)
+        try:
+            os.rename(old_file_path, new_file_path)
+            log(f"File '{file_name}' renamed to '{new_file_name}'.")
+        except Exception as e:
+            log(f"Failed to rename '{file_name}' to '{new_file_name}': {e}")
+        if progress is not None:
+            progress(done, len(csv_files))
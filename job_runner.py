@@ -0,0 +1,122 @@
+import threading
+import time
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+# Seconds between progress updates a task sends to the GUI
+PROGRESS_INTERVAL = 0.1
+
+
+class _TaskSignals(QObject):
+    log = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal()
+
+
+class _Task(QRunnable):
+    """Run one task function on a pool thread and report back through signals."""
+
+    def __init__(self, func, args, cancel_event, log=None):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.cancel_event = cancel_event
+        self.signals = _TaskSignals()
+        self.log = log if log is not None else self.signals.log.emit
+        self.last_progress = 0.0
+
+    def progress(self, done, total):
+        """Forward per-file progress, throttled so a task moving many files does not flood the GUI."""
+        now = time.monotonic()
+        if done >= total or now - self.last_progress >= PROGRESS_INTERVAL:
+            self.last_progress = now
+            self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            # Tasks still queued when the batch is cancelled finish without doing anything
+            if not self.cancel_event.is_set():
+                self.func(*self.args, log=self.log, progress=self.progress, cancelled=self.cancel_event.is_set)
+        except Exception as e:
+            self.log(f"An error occurred: {e}")
+        finally:
+            self.signals.done.emit()
+
+
+class JobRunner(QObject):
+    """Run a batch of tasks on a QThreadPool, reporting progress and supporting cancellation.
+
+    Task functions are called as ``func(*args, log=..., progress=...,
+    cancelled=...)`` on a pool thread; ``log`` forwards a message to the GUI,
+    ``progress(done, total)`` reports the files the task has finished and
+    ``cancelled()`` tells long-running work to stop early. The ``progress``
+    signal sums the files of every task; a task that never reports counts as
+    one file. With a thread-safe ``log_sink`` tasks log into it directly
+    instead of through one signal per message.
+    """
+
+    log = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(bool)
+
+    def __init__(self, max_workers=None, log_sink=None, parent=None):
+        super().__init__(parent)
+        self.log_sink = log_sink
+        self.pool = QThreadPool(self)
+        if max_workers:
+            self.pool.setMaxThreadCount(max_workers)
+        self.cancel_event = threading.Event()
+        self.tasks = []
+        self.task_progress = []
+        self.total = 0
+        self.done = 0
+
+    def isRunning(self):
+        return self.done < self.total
+
+    def start(self, tasks):
+        """Queue a batch of ``(func, args)`` tasks."""
+        self.cancel_event.clear()
+        self.total = len(tasks)
+        self.done = 0
+        self.task_progress = [[0, 1] for _ in tasks]
+        self.progress.emit(0, self.total)
+        if not tasks:
+            self.finished.emit(False)
+            return
+
+        self.tasks = []
+        for index, (func, args) in enumerate(tasks):
+            task = _Task(func, args, self.cancel_event, self.log_sink)
+            # Keep the Python wrapper alive until its signals have been delivered
+            task.setAutoDelete(False)
+            task.signals.log.connect(self.log)
+            task.signals.progress.connect(lambda done, total, index=index: self._taskProgress(index, done, total))
+            task.signals.done.connect(lambda index=index: self._taskDone(index))
+            self.tasks.append(task)
+            self.pool.start(task)
+
+    def cancel(self):
+        """Ask running tasks to stop and skip the ones still queued."""
+        self.cancel_event.set()
+
+    def shutdown(self):
+        """Cancel the batch and block until every task has returned, e.g. before closing its log."""
+        self.cancel()
+        self.pool.waitForDone()
+
+    def _emitProgress(self):
+        self.progress.emit(sum(done for done, total in self.task_progress),
+                           sum(total for done, total in self.task_progress))
+
+    def _taskProgress(self, index, done, total):
+        self.task_progress[index] = [done, max(total, 1)]
+        self._emitProgress()
+
+    def _taskDone(self, index):
+        self.done += 1
+        total = self.task_progress[index][1]
+        self.task_progress[index] = [total, total]
+        self._emitProgress()
+        if self.done == self.total:
+            self.tasks = []
+            self.finished.emit(self.cancel_event.is_set())
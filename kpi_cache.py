@@ -0,0 +1,63 @@
+import json
+import os
+import sqlite3
+
+# Sidecar database kept in the analysed directory
+CACHE_FILE = '.kpi_cache.sqlite'
+
+# Number of new rows written between commits
+COMMIT_EVERY = 100
+
+
+class KPICache:
+    """SQLite sidecar holding KPI rows keyed by file fingerprint and analysis settings."""
+
+    def __init__(self, directory, settings):
+        self.directory = directory
+        self.settings = json.dumps(settings)
+        self.pending = 0
+        self.connection = sqlite3.connect(os.path.join(directory, CACHE_FILE))
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "path TEXT, settings TEXT, size INTEGER, mtime_ns INTEGER, result TEXT, "
+            "PRIMARY KEY (path, settings))")
+
+    def fingerprint(self, path):
+        """Return the cache key of a file: relative path, size and modification time."""
+        stat = os.stat(path)
+        return os.path.relpath(path, self.directory), stat.st_size, stat.st_mtime_ns
+
+    def get(self, path):
+        """Return (True, row) for an unchanged file, or (False, None) when it must be parsed."""
+        relpath, size, mtime_ns = self.fingerprint(path)
+        row = self.connection.execute(
+            "SELECT result FROM results WHERE path = ? AND settings = ? AND size = ? AND mtime_ns = ?",
+            (relpath, self.settings, size, mtime_ns)).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def put(self, path, result):
+        """Store the row computed for a file; None records a file without KPI columns."""
+        relpath, size, mtime_ns = self.fingerprint(path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (path, settings, size, mtime_ns, result) VALUES (?, ?, ?, ?, ?)",
+            (relpath, self.settings, size, mtime_ns, json.dumps(result)))
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.connection.commit()
+            self.pending = 0
+
+    def close(self):
+        """Commit outstanding rows and close the database."""
+        self.connection.commit()
+        self.connection.close()
+
+
+def clear_cache(directory):
+    """Delete the cache sidecar of a directory. Returns True if one existed."""
+    cache_path = os.path.join(directory, CACHE_FILE)
+    if not os.path.exists(cache_path):
+        return False
+    os.remove(cache_path)
+    return True
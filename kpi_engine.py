@@ -0,0 +1,365 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from csv_stream import read_header, iter_chunks
+
+# Base name of the coverage grid the KPI tool writes into the analysed directory
+GRID_OUTPUT = 'Coverage_Grid'
+
+
+def update_column_mapping(RSRP_columns, CINR_columns):
+    """Update column mapping based on user input."""
+    column_mapping = {}
+    for i, col in enumerate(RSRP_columns):
+        if col:
+            column_mapping[col] = f'R{i+1} CINR (0)'
+    for i, col in enumerate(CINR_columns):
+        if col:
+            column_mapping[f'R{i+1} RSRP (dBm)'] = col
+    return column_mapping
+
+
+def column_values(frame, col):
+    """Return the raw values of a column as a floating point NumPy array."""
+    values = frame[col].to_numpy()
+    if values.dtype.kind != 'f':
+        values = values.astype(np.float64)
+    return values
+
+
+def coverage_counts(frame, RSRP_cols, CINR_cols, RSRP_conditions, CINR_conditions):
+    """Count valid rows and RSRP/CINR passes in one pass over the column arrays."""
+    RSRP_values = [column_values(frame, col) for col in RSRP_cols]
+    CINR_values = [column_values(frame, col) for col in CINR_cols]
+
+    # A row is only counted when none of the selected columns is missing
+    valid = np.ones(len(frame), dtype=bool)
+    for values in RSRP_values + CINR_values:
+        valid &= ~np.isnan(values)
+
+    RSRP_pass = np.zeros(len(frame), dtype=bool)
+    if RSRP_conditions is not None:
+        for values in RSRP_values:
+            RSRP_pass |= values >= RSRP_conditions
+
+    CINR_pass = np.zeros(len(frame), dtype=bool)
+    if CINR_conditions is not None:
+        for values in CINR_values:
+            CINR_pass |= values >= CINR_conditions
+
+    return {
+        'rows': int(np.count_nonzero(valid)),
+        'RSRP': int(np.count_nonzero(RSRP_pass & valid)),
+        'CINR': int(np.count_nonzero(CINR_pass & valid)),
+    }
+
+
+def format_result(name, counts):
+    """Turn pass counts into an output row with rounded percentages."""
+    return {'File': name,
+            'RSRP': format_percentage(counts['RSRP'], counts['rows']),
+            'CINR': format_percentage(counts['CINR'], counts['rows'])}
+
+
+def value_histogram(values):
+    """Count values in 1 dB bins, each bin labelled by its lower edge.
+
+    Since a value reaches a whole-number threshold exactly when its rounded-down
+    value does, the histogram answers every integer threshold without error.
+    """
+    bins, counts = np.unique(np.floor(values), return_counts=True)
+    return bins, counts.astype(np.int64)
+
+
+def merge_histograms(first, second):
+    """Combine two value histograms into one."""
+    bins, inverse = np.unique(np.concatenate([first[0], second[0]]), return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate([first[1], second[1]]), minlength=len(bins))
+    return bins, counts.astype(np.int64)
+
+
+def empty_histogram():
+    """Return a histogram without any samples."""
+    return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64)
+
+
+def count_at_least(histogram, threshold):
+    """Return the number of samples at or above a threshold."""
+    bins, counts = histogram
+    return int(counts[bins >= threshold].sum())
+
+
+def coverage_histograms(frame, RSRP_cols, CINR_cols):
+    """Histogram the best RSRP and CINR of every valid row in one pass.
+
+    A row passes a threshold when any selected column reaches it, which is the
+    same as its row-wise maximum reaching it.
+    """
+    RSRP_values = [column_values(frame, col) for col in RSRP_cols]
+    CINR_values = [column_values(frame, col) for col in CINR_cols]
+
+    valid = np.ones(len(frame), dtype=bool)
+    for values in RSRP_values + CINR_values:
+        valid &= ~np.isnan(values)
+
+    histograms = {'rows': int(np.count_nonzero(valid))}
+    for key, values in (('RSRP', RSRP_values), ('CINR', CINR_values)):
+        if values:
+            histograms[key] = value_histogram(np.maximum.reduce(values)[valid])
+        else:
+            histograms[key] = empty_histogram()
+    return histograms
+
+
+def histogram_file(path, RSRP_columns, CINR_columns, header=None, columnar=False):
+    """Build the RSRP/CINR histograms of one CSV file, or None if it has no KPI columns."""
+    if header is None:
+        header = read_header(path)
+    if not has_kpi_columns(header, RSRP_columns, CINR_columns):
+        return None
+
+    RSRP_cols = [col for col in RSRP_columns if col and col in header]
+    CINR_cols = [col for col in CINR_columns if col and col in header]
+    histograms = {'rows': 0, 'RSRP': empty_histogram(), 'CINR': empty_histogram()}
+    if RSRP_cols or CINR_cols:
+        for chunk in iter_chunks(path, RSRP_cols + CINR_cols, columnar=columnar):
+            chunk_histograms = coverage_histograms(chunk, RSRP_cols, CINR_cols)
+            histograms['rows'] += chunk_histograms['rows']
+            histograms['RSRP'] = merge_histograms(histograms['RSRP'], chunk_histograms['RSRP'])
+            histograms['CINR'] = merge_histograms(histograms['CINR'], chunk_histograms['CINR'])
+    return histograms
+
+
+def format_percentage(count, rows):
+    """Format a pass count as the rounded percentage used in the output workbook."""
+    return f"{round((count / rows) * 100) if rows > 0 else 0}%"
+
+
+def histogram_result(name, histograms, RSRP_conditions, CINR_conditions):
+    """Build the regular output row for one file from its histograms."""
+    counts = {'rows': histograms['rows'], 'RSRP': 0, 'CINR': 0}
+    if RSRP_conditions is not None:
+        counts['RSRP'] = count_at_least(histograms['RSRP'], RSRP_conditions)
+    if CINR_conditions is not None:
+        counts['CINR'] = count_at_least(histograms['CINR'], CINR_conditions)
+    return format_result(name, counts)
+
+
+def sweep_table(file_histograms, key, thresholds):
+    """Build the threshold-by-file coverage matrix for RSRP or CINR."""
+    table = []
+    for name, histograms in file_histograms:
+        row = {'File': name}
+        for threshold in thresholds:
+            row[str(threshold)] = format_percentage(count_at_least(histograms[key], threshold), histograms['rows'])
+        table.append(row)
+    return table
+
+
+def cdf_table(file_histograms, key):
+    """Build the campaign-wide CDF of RSRP or CINR over all files."""
+    total = empty_histogram()
+    for name, histograms in file_histograms:
+        total = merge_histograms(total, histograms[key])
+    bins, counts = total
+    cumulative = np.cumsum(counts)
+    # Bins are labelled by their lower edge; report the upper edge each cumulative count reaches
+    bins = bins + 1
+    samples = int(cumulative[-1]) if len(cumulative) else 0
+    return [{'Value': float(value), 'Samples': int(count), 'CDF (%)': round(float(cum) / samples * 100, 2)}
+            for value, count, cum in zip(bins, counts, cumulative)]
+
+
+def add_counts(total, counts):
+    """Add the counts of one chunk to a running total."""
+    for key, value in counts.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def has_kpi_columns(header, RSRP_columns, CINR_columns):
+    """Check whether a file header contains any of the mapped KPI columns."""
+    column_mapping = update_column_mapping(RSRP_columns, CINR_columns)
+    return any(col in header for col in column_mapping.keys())
+
+
+def analyze_file(path, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, header=None, columnar=False):
+    """Compute the KPI row for one CSV file, or None if it has no KPI columns."""
+    if header is None:
+        header = read_header(path)
+    if not has_kpi_columns(header, RSRP_columns, CINR_columns):
+        return None
+
+    RSRP_cols = [col for col in RSRP_columns if col and col in header]
+    CINR_cols = [col for col in CINR_columns if col and col in header]
+    counts = {'rows': 0, 'RSRP': 0, 'CINR': 0}
+    if RSRP_cols or CINR_cols:
+        for chunk in iter_chunks(path, RSRP_cols + CINR_cols, columnar=columnar):
+            add_counts(counts, coverage_counts(chunk, RSRP_cols, CINR_cols, RSRP_conditions, CINR_conditions))
+    return format_result(os.path.basename(path), counts)
+
+
+def is_data_csv(name):
+    """Check whether a file name is a CSV to analyse rather than one of the tool's own outputs."""
+    return name.endswith('.csv') and name != f'{GRID_OUTPUT}.csv'
+
+
+def find_csv_files(directory):
+    """Return every CSV file under a directory, sorted by path."""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for name in filenames:
+            if is_data_csv(name):
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def index_headers(paths):
+    """Probe the first line of each file, returning a header index and per-file warnings."""
+    header_index = {}
+    warnings = []
+    for path in paths:
+        try:
+            header_index[path] = read_header(path)
+        except Exception as e:
+            warnings.append(f"Error processing {os.path.basename(path)}: {str(e)}")
+    return header_index, warnings
+
+
+def _run_task(task):
+    """Run one file task in a worker, returning the error message instead of raising."""
+    func, args = task
+    try:
+        return func(*args), None
+    except Exception as e:
+        return None, f"Error processing {os.path.basename(args[0])}: {str(e)}"
+
+
+def run_tasks(func, arg_list, workers=None, progress=None, on_outcome=None):
+    """Call ``func(*args)`` for every entry of ``arg_list`` on a process pool.
+
+    Outcomes are ``(result, error)`` pairs in the order of ``arg_list``; a file
+    that fails only produces its own error. A worker that dies hard (e.g. out
+    of memory) breaks the whole pool, so the files it left unfinished are run
+    again on a fresh pool until the one at fault is found. With a single
+    worker everything runs in the calling process. ``on_outcome(index,
+    outcome)`` and ``progress(done, total)`` are called in the calling process
+    whenever a file finishes.
+    """
+    tasks = [(func, args) for args in arg_list]
+    outcomes = [None] * len(tasks)
+    finished = [0]
+
+    def report(index, outcome):
+        outcomes[index] = outcome
+        finished[0] += 1
+        if on_outcome is not None:
+            on_outcome(index, outcome)
+        if progress is not None:
+            progress(finished[0], len(tasks))
+
+    if workers == 1:
+        for index, task in enumerate(tasks):
+            report(index, _run_task(task))
+        return outcomes
+
+    groups = [list(range(len(tasks)))] if tasks else []
+    while groups:
+        indices = groups.pop()
+        crashed = _run_pool(tasks, indices, workers, report)
+        if len(crashed) == 1:
+            index = crashed[0]
+            report(index, (None, f"Error processing {os.path.basename(arg_list[index][0])}: worker process crashed"))
+        elif len(crashed) == len(indices):
+            # Nothing finished before the pool broke: split the files to corner the one at fault
+            middle = len(crashed) // 2
+            groups += [crashed[middle:], crashed[:middle]]
+        elif crashed:
+            groups.append(crashed)
+    return outcomes
+
+
+def _run_pool(tasks, indices, workers, report):
+    """Run some tasks on a fresh process pool and return the indices lost when a worker died."""
+    crashed = []
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(indices))) as executor:
+        futures = {executor.submit(_run_task, tasks[index]): index for index in indices}
+        for future in as_completed(futures):
+            try:
+                outcome = future.result()
+            except Exception:
+                crashed.append(futures[future])
+                continue
+            report(futures[future], outcome)
+    return sorted(crashed)
+
+
+def analyze_directory(directory, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions,
+                      workers=None, progress=None, cache=None, columnar=False, skip=None, on_result=None):
+    """Analyze every CSV under a directory on a process pool.
+
+    Files listed in ``skip`` are left out and files unchanged since the last
+    run are answered from ``cache`` when one is given. Headers of the remaining
+    files are probed up front so files without KPI columns never reach the
+    pool. ``on_result(path, row)`` is called as soon as each file is known.
+    Result rows come back in sorted path order together with one warning per
+    file that could not be processed.
+    """
+    paths = [path for path in find_csv_files(directory) if skip is None or path not in skip]
+    known = {}
+
+    def record(path, result, store=True):
+        known[path] = result
+        if store and cache is not None:
+            cache.put(path, result)
+        if on_result is not None:
+            on_result(path, result)
+
+    if cache is not None:
+        for path in paths:
+            found, result = cache.get(path)
+            if found:
+                record(path, result, store=False)
+
+    header_index, warnings = index_headers([path for path in paths if path not in known])
+    tasks = []
+    for path, header in header_index.items():
+        if has_kpi_columns(header, RSRP_columns, CINR_columns):
+            tasks.append((path, RSRP_columns, CINR_columns, RSRP_conditions, CINR_conditions, header, columnar))
+        else:
+            record(path, None)
+
+    errors = {}
+
+    def on_outcome(index, outcome):
+        result, error = outcome
+        if error is not None:
+            errors[index] = error
+        else:
+            record(tasks[index][0], result)
+
+    run_tasks(analyze_file, tasks, workers, progress, on_outcome)
+    warnings.extend(errors[index] for index in sorted(errors))
+    results = [known[path] for path in paths if known.get(path) is not None]
+    return results, warnings
+
+
+def sweep_directory(directory, RSRP_columns, CINR_columns, workers=None, progress=None, columnar=False):
+    """Histogram every CSV under a directory with a single read per file.
+
+    Returns ``(file name, histograms)`` pairs in sorted path order, from which
+    coverage at any whole-number threshold follows without further I/O, plus
+    one warning per file that could not be processed.
+    """
+    header_index, warnings = index_headers(find_csv_files(directory))
+    tasks = [(path, RSRP_columns, CINR_columns, header, columnar)
+             for path, header in header_index.items()
+             if has_kpi_columns(header, RSRP_columns, CINR_columns)]
+
+    file_histograms = []
+    for task, (histograms, error) in zip(tasks, run_tasks(histogram_file, tasks, workers, progress)):
+        if error is not None:
+            warnings.append(error)
+        elif histograms is not None:
+            file_histograms.append((os.path.basename(task[0]), histograms))
+    return file_histograms, warnings
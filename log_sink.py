@@ -0,0 +1,96 @@
+import json
+import os
+import queue
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+# Lines kept for display; older ones are dropped from the buffer and the widget
+MAX_LINES = 2000
+# Milliseconds between batched widget updates
+FLUSH_INTERVAL = 200
+LOG_DIR = os.path.join(os.path.expanduser('~'), '.tool_logs')
+
+
+def log_file_path(tool):
+    return os.path.join(LOG_DIR, f"{tool}.jsonl")
+
+
+class LogSink:
+    """Thread-safe log sink shared by the tools.
+
+    Messages go into a capped ring buffer that a view drains at a fixed
+    interval, and as JSON lines to a log file written on a background thread.
+    A sink can be passed anywhere a ``log(message)`` callable is expected.
+    """
+
+    def __init__(self, tool, log_file=None, capacity=MAX_LINES):
+        self.tool = tool
+        self.capacity = capacity
+        self.pending = deque(maxlen=capacity)
+        self.dropped = 0
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.records = queue.Queue()
+        self.log_file = log_file if log_file is not None else log_file_path(tool)
+        self.writer = threading.Thread(target=self.write_records, daemon=True)
+        self.writer.start()
+
+    def log(self, message, level='info', **fields):
+        with self.lock:
+            if len(self.pending) == self.capacity:
+                self.dropped += 1
+            self.pending.append(message)
+            self.counts[level] += 1
+        record = {'time': datetime.now().isoformat(timespec='milliseconds'), 'tool': self.tool,
+                  'level': level, 'message': message}
+        record.update(fields)
+        self.records.put(record)
+
+    __call__ = log
+
+    def drain(self):
+        """Return the lines logged since the last drain and how many were dropped in between."""
+        with self.lock:
+            lines = list(self.pending)
+            dropped = self.dropped
+            self.pending.clear()
+            self.dropped = 0
+        return lines, dropped
+
+    def write_records(self):
+        try:
+            os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
+            log_file = open(self.log_file, 'a', encoding='utf-8')
+        except OSError:
+            log_file = None
+        while True:
+            record = self.records.get()
+            if record is None:
+                break
+            # Write everything already queued before flushing once
+            batch = [record]
+            while True:
+                try:
+                    record = self.records.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    self.records.put(None)
+                    break
+                batch.append(record)
+            if log_file is not None:
+                log_file.write(''.join(json.dumps(r, default=str) + '\n' for r in batch))
+                log_file.flush()
+        if log_file is not None:
+            log_file.close()
+
+    def close(self):
+        """Write out the remaining records and stop the writer thread."""
+        self.records.put(None)
+        self.writer.join()
+
+
+def omitted_line(dropped):
+    return f"... {dropped} earlier lines omitted"
+
@@ -0,0 +1,109 @@
+import os
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pptx.dml.color import RGBColor
+from slide_transforms import CHANGED, FAILED, UNCHANGED, Border, Center, transform_deck
+
+# Black color (RGB)
+BLACK = RGBColor(0, 0, 0)
+
+
+def align_deck(pptx_path, weight, color=None, media_dpi=None):
+    """Center every picture of a deck and set its border weight (and colour), saving over the original."""
+    return transform_deck(pptx_path, [Center(), Border(weight, color)],
+                          "Pictures aligned to center and border weights adjusted successfully", media_dpi)
+
+
+def border_deck(pptx_path, weight, media_dpi=None):
+    """Give every picture of a deck a solid black border of the given weight, saving over the original."""
+    return transform_deck(pptx_path, [Border(weight, BLACK)], "Border width adjusted successfully", media_dpi)
+
+
+def _run_deck(func, pptx_path, args):
+    try:
+        status, message = func(pptx_path, *args)
+    except Exception as e:
+        status, message = FAILED, f"Error processing the presentation {pptx_path}: {e}"
+    return pptx_path, status, message
+
+
+class DeckJob:
+    """Process decks on a pool of worker processes while the GUI polls for their outcomes.
+
+    ``func(pptx_path, *args)`` returns ``(status, message)``. The job runs on a
+    background thread and queues one ``(pptx_path, status, message)`` outcome
+    per deck as it finishes, so the Tk loop only drains the queue and never
+    waits on a deck. A deck that fails, even by taking its worker process
+    down, is reported and the others carry on.
+    """
+
+    def __init__(self, func, paths, args=(), workers=None):
+        self.func = func
+        # A deck selected twice would have two workers replacing the same file
+        unique = {}
+        for path in paths:
+            if path.strip():
+                unique.setdefault(os.path.normcase(os.path.abspath(path)), path)
+        self.paths = list(unique.values())
+        self.args = tuple(args)
+        self.workers = workers or os.cpu_count() or 1
+        self.outcomes = queue.Queue()
+        self.done_decks = 0
+        self.failures = []
+        self.counts = Counter()
+        self.finished = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        try:
+            groups = [self.paths] if self.paths else []
+            while groups:
+                paths = groups.pop()
+                crashed = self.run_pool(paths)
+                if len(crashed) == 1:
+                    path = crashed[0]
+                    self.report(path, FAILED, f"Error processing the presentation {path}: worker process crashed")
+                elif len(crashed) == len(paths):
+                    # Nothing finished before the pool broke: split the decks to corner the one at fault
+                    middle = len(crashed) // 2
+                    groups += [crashed[middle:], crashed[:middle]]
+                elif crashed:
+                    groups.append(crashed)
+        finally:
+            self.finished.set()
+
+    def run_pool(self, paths):
+        """Run decks on a fresh pool and return the ones lost when a worker process died."""
+        crashed = []
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(paths))) as pool:
+            futures = {pool.submit(_run_deck, self.func, path, self.args): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    self.report(*future.result())
+                except Exception:
+                    crashed.append(futures[future])
+        return crashed
+
+    def report(self, pptx_path, status, message):
+        self.done_decks += 1
+        self.counts[status] += 1
+        if status == FAILED:
+            self.failures.append((pptx_path, message))
+        self.outcomes.put((pptx_path, status, message))
+
+    def summary(self):
+        return (f"{self.counts[CHANGED]} changed, {self.counts[UNCHANGED]} unchanged, "
+                f"{self.counts[FAILED]} failed of {len(self.paths)} presentations")
+
+    def drain(self):
+        """Return the outcomes queued since the last call."""
+        outcomes = []
+        while True:
+            try:
+                outcomes.append(self.outcomes.get_nowait())
+            except queue.Empty:
+                return outcomes
@@ -0,0 +1,23 @@
+from PyQt5.QtCore import QObject, QTimer
+from log_sink import FLUSH_INTERVAL, omitted_line
+
+
+class QtLogView(QObject):
+    """Show a sink's lines in a QTextEdit, appended in one batch per timer tick."""
+
+    def __init__(self, text_edit, sink, interval=FLUSH_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.sink = sink
+        self.text_edit.document().setMaximumBlockCount(sink.capacity)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(interval)
+
+    def flush(self):
+        lines, dropped = self.sink.drain()
+        if not lines:
+            return
+        if dropped:
+            lines.insert(0, omitted_line(dropped))
+        self.text_edit.append('\n'.join(lines))
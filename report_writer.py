@@ -0,0 +1,129 @@
+import csv
+import json
+import os
+from openpyxl import Workbook
+
+# Side file next to the workbook that receives rows while a run is in progress; not
+# a .csv so later scans of the directory never take it for a data file
+PARTIAL_SUFFIX = '.partial'
+RESULT_COLUMNS = ['File', 'RSRP', 'CINR']
+
+# Rows written between flushes of the side file to disk
+FLUSH_EVERY = 20
+
+
+def partial_path(output_file):
+    """Return the side file used while a report is being written."""
+    return output_file + PARTIAL_SUFFIX
+
+
+def encode_settings(settings):
+    """Return analysis settings in the form they are recorded in the side file."""
+    return json.dumps(settings)
+
+
+def partial_settings(output_file):
+    """Return the settings an interrupted report was started with, or None if there is none."""
+    try:
+        with open(partial_path(output_file), newline='', encoding='utf-8') as f:
+            return f.readline().rstrip('\r\n')
+    except FileNotFoundError:
+        return None
+
+
+def write_workbook(output_file, sheets):
+    """Write rows to an xlsx workbook in constant-memory (write-only) mode.
+
+    ``sheets`` is a list of ``(sheet name, rows)`` pairs where rows are dicts or
+    any iterable of dicts; the columns come from the first row of each sheet.
+    """
+    workbook = Workbook(write_only=True)
+    for name, rows in sheets:
+        sheet = workbook.create_sheet(name)
+        columns = None
+        for row in rows:
+            if columns is None:
+                columns = list(row.keys())
+                sheet.append(columns)
+            sheet.append([row.get(col) for col in columns])
+    if not sheets:
+        workbook.create_sheet('Sheet1')
+    workbook.save(output_file)
+
+
+class ReportWriter:
+    """Stream KPI rows to a side file as files finish and build the workbook at the end.
+
+    Every processed file is recorded, so an interrupted run can be resumed by
+    skipping the files already listed in the side file. The side file starts
+    with the analysis settings, and a run with other settings cannot resume it.
+    """
+
+    def __init__(self, output_file, settings, resume=False, flush_every=FLUSH_EVERY):
+        self.output_file = output_file
+        self.partial_file = partial_path(output_file)
+        self.settings = encode_settings(settings)
+        self.flush_every = flush_every
+        self.pending = 0
+        self.done = set()
+
+        if resume and os.path.exists(self.partial_file):
+            if partial_settings(output_file) != self.settings:
+                raise ValueError("The interrupted analysis used different columns or conditions")
+            for row in self.read_rows():
+                self.done.add(row['Path'])
+            self.file = open(self.partial_file, 'a+', newline='', encoding='utf-8')
+            # A crash can leave half a row behind; start the next one on a fresh line
+            self.file.seek(0, os.SEEK_END)
+            if self.file.tell() > 0:
+                self.file.seek(self.file.tell() - 1)
+                if self.file.read(1) != '\n':
+                    self.file.write('\n')
+            self.writer = csv.writer(self.file)
+        else:
+            self.file = open(self.partial_file, 'w', newline='', encoding='utf-8')
+            self.file.write(self.settings + '\n')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(['Path'] + RESULT_COLUMNS)
+
+    def read_rows(self):
+        """Read back the rows recorded in the side file, dropping incomplete ones."""
+        with open(self.partial_file, newline='', encoding='utf-8') as f:
+            f.readline()
+            for row in csv.DictReader(f):
+                if row.get('Path') and None not in row.values():
+                    yield row
+
+    def is_done(self, path):
+        """Check whether a file is already recorded."""
+        return path in self.done
+
+    def add(self, path, result):
+        """Record the row of one file; None records a file without KPI columns."""
+        if result is None:
+            self.writer.writerow([path] + [''] * len(RESULT_COLUMNS))
+        else:
+            self.writer.writerow([path] + [result[col] for col in RESULT_COLUMNS])
+        self.done.add(path)
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Push recorded rows to disk."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def finish(self):
+        """Write the workbook in path order and remove the side file."""
+        self.close()
+        rows = sorted((row for row in self.read_rows() if row['File']), key=lambda row: row['Path'])
+        write_workbook(self.output_file, [('Sheet1', ({col: row[col] for col in RESULT_COLUMNS} for row in rows))])
+        os.remove(self.partial_file)
+
+    def close(self):
+        """Close the side file, keeping it so the run can be resumed."""
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
@@ -0,0 +1,222 @@
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from lxml import etree
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Pt
+from deck_media import plan_media
+from deck_xml import UnsupportedDeck, rewrite_slides, write_zip
+
+# Outcome of transforming one deck
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
+
+class Resize:
+    """Scale a picture by a factor, or to a width and/or height in EMU, keeping its aspect ratio."""
+
+    def __init__(self, scale=None, width=None, height=None):
+        self.scale = scale
+        self.width = width
+        self.height = height
+
+    def __call__(self, shape, prs):
+        if self.scale is not None:
+            factor_w = factor_h = self.scale
+        else:
+            factor_w = self.width / shape.width if self.width else None
+            factor_h = self.height / shape.height if self.height else None
+            factor_w = factor_w if factor_w is not None else factor_h
+            factor_h = factor_h if factor_h is not None else factor_w
+            if factor_w is None:
+                return
+        shape.width = int(shape.width * factor_w)
+        shape.height = int(shape.height * factor_h)
+
+
+class Center:
+    """Center a picture on its slide."""
+
+    def __call__(self, shape, prs):
+        shape.left = int((prs.slide_width - shape.width) / 2)
+        shape.top = int((prs.slide_height - shape.height) / 2)
+
+
+class Border:
+    """Set the border weight of a picture in points, and its colour as a solid fill when given."""
+
+    def __init__(self, weight, color=None):
+        self.weight = float(weight)
+        self.color = color
+
+    def __call__(self, shape, prs):
+        line = shape.line
+        if self.color is not None:
+            line.fill.solid()
+            line.fill.fore_color.rgb = self.color
+        line.width = Pt(self.weight)
+
+
+def apply_transforms(prs, transforms):
+    """Apply the transforms in order to every picture of a presentation, in one traversal.
+
+    Returns the number of pictures whose shape properties actually changed.
+    """
+    changed = 0
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+                before = etree.tostring(shape._element.spPr)
+                for transform in transforms:
+                    transform(shape, prs)
+                if etree.tostring(shape._element.spPr) != before:
+                    changed += 1
+    return changed
+
+
+def save_atomic(prs, pptx_path):
+    """Save through a temp file in the same folder, so a failed save never damages the original.
+
+    The saved deck keeps the permissions of the file it replaces.
+    """
+    fd, temp_path = tempfile.mkstemp(suffix='.pptx', dir=os.path.dirname(os.path.abspath(pptx_path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            prs.save(f)
+        if os.path.exists(pptx_path):
+            shutil.copymode(pptx_path, temp_path)
+        os.replace(temp_path, pptx_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def edit_deck(pptx_path, transforms, media_dpi=None):
+    """Rewrite the slide XML of a deck, and slim its media when ``media_dpi`` is set, in one write.
+
+    Every untouched entry is copied without recompressing. Returns
+    ``(pictures changed, media plan or None)``; nothing is written when
+    neither finds anything to do. Raises UnsupportedDeck for decks the direct
+    editor cannot handle, before the deck is replaced.
+    """
+    with zipfile.ZipFile(pptx_path) as source:
+        slides = rewrite_slides(source, transforms)
+        media = plan_media(source, media_dpi, slides) if media_dpi else None
+    if slides or media:
+        replaced = dict(slides)
+        if media:
+            replaced.update(media.replaced)
+        write_zip(pptx_path, replaced, media.removed if media else ())
+    return bool(slides), media
+
+
+def save_deck(prs, pptx_path, changed, media_dpi=None):
+    """Save a python-pptx deck, slimming its media in the same write when ``media_dpi`` is set.
+
+    Returns the media plan that was applied, or None.
+    """
+    if media_dpi:
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        with zipfile.ZipFile(buffer) as source:
+            media = plan_media(source, media_dpi)
+        if media:
+            try:
+                write_zip(pptx_path, media.replaced, media.removed, source=buffer)
+                return media
+            except UnsupportedDeck:
+                pass
+    if changed:
+        save_atomic(prs, pptx_path)
+    return None
+
+
+def outcome(pptx_path, description, changed, media):
+    """Build the ``(status, message)`` reported for one deck."""
+    if not changed and not media:
+        return UNCHANGED, f"No changes needed for {pptx_path}"
+    message = f"{description} for {pptx_path}" if changed else f"Media optimized for {pptx_path}"
+    if media:
+        message += f"; {media.describe()}"
+    return CHANGED, message
+
+
+def transform_deck(pptx_path, transforms, description="Pictures transformed successfully", media_dpi=None):
+    """Apply every transform to the pictures of a deck with one load and at most one save.
+
+    The slide XML is edited directly when possible, leaving media untouched;
+    decks the direct editor cannot handle go through python-pptx instead.
+    With ``media_dpi`` the media pass of ``plan_media`` goes into the same
+    save. Decks that already have the changes are not written at all.
+    Returns ``(status, message)`` with status CHANGED, UNCHANGED or FAILED.
+    """
+    try:
+        return outcome(pptx_path, description, *edit_deck(pptx_path, transforms, media_dpi))
+    except (UnsupportedDeck, zipfile.BadZipFile):
+        # Raised before the deck is replaced, so python-pptx starts from the original
+        pass
+    except Exception as e:
+        return FAILED, f"Error editing the presentation {pptx_path}: {e}"
+
+    try:
+        prs = Presentation(pptx_path)
+    except Exception as e:
+        return FAILED, f"Error opening the presentation {pptx_path}: {e}"
+
+    changed = apply_transforms(prs, transforms) > 0
+    try:
+        media = save_deck(prs, pptx_path, changed, media_dpi)
+    except Exception as e:
+        return FAILED, f"Error saving the presentation {pptx_path}: {e}"
+    return outcome(pptx_path, description, changed, media)
+
+
+def element_key(element):
+    """Reduce an element to a comparable form that ignores prefixes and attribute order."""
+    return (element.tag, sorted(element.attrib.items()), element.text, element.tail,
+            [element_key(child) for child in element])
+
+
+def compare_editors(pptx_path, transforms):
+    """Apply transforms to copies of a deck with the direct XML editor and with python-pptx.
+
+    Returns the numbers of the slides whose XML differs between the two
+    results; an empty list means both paths produced the same deck.
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        xml_path = os.path.join(folder, 'xml.pptx')
+        pptx_copy = os.path.join(folder, 'pptx.pptx')
+        shutil.copyfile(pptx_path, xml_path)
+        shutil.copyfile(pptx_path, pptx_copy)
+        edit_deck(xml_path, transforms)
+        prs = Presentation(pptx_copy)
+        apply_transforms(prs, transforms)
+        prs.save(pptx_copy)
+        xml_slides = [element_key(slide._element) for slide in Presentation(xml_path).slides]
+        pptx_slides = [element_key(slide._element) for slide in Presentation(pptx_copy).slides]
+    if len(xml_slides) != len(pptx_slides):
+        return list(range(1, max(len(xml_slides), len(pptx_slides)) + 1))
+    return [number for number, (a, b) in enumerate(zip(xml_slides, pptx_slides), 1) if a != b]
+
+
+if __name__ == '__main__':
+    # Check the direct XML editor against python-pptx on the decks given on the command line
+    import sys
+    from pptx.dml.color import RGBColor
+
+    checks = {
+        'align': [Center(), Border(2)],
+        'black border': [Border(3, RGBColor(0, 0, 0))],
+        'resize': [Resize(scale=0.5), Center()],
+    }
+    mismatches = 0
+    for path in sys.argv[1:]:
+        for name, transforms in checks.items():
+            slides = compare_editors(path, transforms)
+            mismatches += bool(slides)
+            print(f"{path} [{name}]: " + (f"differs on slides {slides}" if slides else "same result"))
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+from copy_engine import file_checksum
+
+# Manifest kept in each destination folder
+MANIFEST_FILE = '.sync_manifest.json'
+
+class SyncManifest:
+    """Remember which source version produced each destination file.
+
+    A destination is up to date when it still exists and its source has the
+    same size and modification time, or with ``content_hash`` the same full
+    content checksum, as when it was last written with the same settings.
+    Only the checksum of the whole file can clear a source whose time changed.
+    """
+
+    def __init__(self, destination_folder, content_hash=False):
+        self.path = os.path.join(destination_folder, MANIFEST_FILE)
+        self.content_hash = content_hash
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # A damaged manifest only means everything is transferred again
+                self.entries = {}
+
+    def is_current(self, source, destination, settings=None):
+        """Check whether a destination file was written from the current source version."""
+        with self.lock:
+            entry = self.entries.get(os.path.basename(destination))
+        if entry is None or not os.path.exists(destination):
+            return False
+        if entry['source'] != os.path.abspath(source) or entry['settings'] != settings:
+            return False
+        if os.path.getsize(destination) != entry['destination_size']:
+            return False
+
+        stat = os.stat(source)
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        if self.content_hash and entry.get('checksum') and stat.st_size == entry['size']:
+            if file_checksum(source) == entry['checksum']:
+                # Touched but unchanged: remember the new time so the hash is not needed next run
+                with self.lock:
+                    entry['mtime_ns'] = stat.st_mtime_ns
+                return True
+        return False
+
+    def record(self, source, destination, settings=None):
+        """Remember the source version a destination file was just written from."""
+        stat = os.stat(source)
+        entry = {
+            'source': os.path.abspath(source),
+            'settings': settings,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'destination_size': os.path.getsize(destination),
+        }
+        if self.content_hash:
+            entry['checksum'] = file_checksum(source)
+        with self.lock:
+            self.entries[os.path.basename(destination)] = entry
+
+    def save(self):
+        """Write the manifest atomically next to the destination files."""
+        with self.lock:
+            data = json.dumps(self.entries, indent=1)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,29 @@
+import tkinter as tk
+from log_sink import FLUSH_INTERVAL, omitted_line
+
+
+class TkLogView:
+    """Show a sink's lines in a Tk Text widget, one batched insert per interval."""
+
+    def __init__(self, text_widget, sink, interval=FLUSH_INTERVAL):
+        self.text = text_widget
+        self.sink = sink
+        self.interval = interval
+
+    def flush(self):
+        lines, dropped = self.sink.drain()
+        if not lines:
+            return
+        if dropped:
+            lines.insert(0, omitted_line(dropped))
+        self.text.insert(tk.END, '\n'.join(lines) + '\n')
+        # Keep the widget as bounded as the buffer
+        excess = int(self.text.index('end-1c').split('.')[0]) - 1 - self.sink.capacity
+        if excess > 0:
+            self.text.delete('1.0', f'{excess + 1}.0')
+        self.text.see(tk.END)
+
+    def start(self):
+        """Flush periodically from the Tk event loop."""
+        self.flush()
+        self.text.after(self.interval, self.start)
@@ -0,0 +1,120 @@
+import tkinter as tk
+
+# Rows moved by one mouse wheel notch
+WHEEL_ROWS = 3
+
+
+class VirtualListbox(tk.Listbox):
+    """Listbox that keeps its items in Python and renders only the visible rows.
+
+    It stands in for a MULTIPLE-select Listbox: insert, delete, get, size,
+    curselection and yview work on the full item list, so folders with
+    hundreds of thousands of files fill and scroll instantly.
+    """
+
+    def __init__(self, master=None, **kw):
+        self.scroll_command = kw.pop('yscrollcommand', None)
+        super().__init__(master, **kw)
+        self.items = []
+        self.selected = set()
+        self.offset = 0
+        self.bind('<<ListboxSelect>>', self.sync_selection)
+        self.bind('<MouseWheel>', lambda event: self.scroll_rows(-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS))
+        self.bind('<Button-4>', lambda event: self.scroll_rows(-WHEEL_ROWS))
+        self.bind('<Button-5>', lambda event: self.scroll_rows(WHEEL_ROWS))
+        self.bind('<Configure>', lambda event: self.render())
+
+    def configure(self, cnf=None, **kw):
+        if 'yscrollcommand' in kw:
+            self.scroll_command = kw.pop('yscrollcommand')
+            self.render()
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def visible_rows(self):
+        return max(1, int(self.cget('height')))
+
+    def render(self):
+        rows = self.visible_rows()
+        self.offset = max(0, min(self.offset, len(self.items) - rows))
+        window = self.items[self.offset:self.offset + rows]
+        super().delete(0, tk.END)
+        if window:
+            super().insert(tk.END, *window)
+        for row in range(len(window)):
+            if self.offset + row in self.selected:
+                super().selection_set(row)
+        if self.scroll_command is not None:
+            self.scroll_command(*self.yview())
+
+    def sync_selection(self, event=None):
+        """Copy the selection of the rendered rows back to the full item list."""
+        shown = set(super().curselection())
+        for row in range(min(self.visible_rows(), len(self.items) - self.offset)):
+            if row in shown:
+                self.selected.add(self.offset + row)
+            else:
+                self.selected.discard(self.offset + row)
+
+    def scroll_rows(self, rows):
+        self.offset += rows
+        self.render()
+        return 'break'
+
+    def insert(self, index, *elements):
+        if index == tk.END:
+            self.items.extend(elements)
+        else:
+            self.items[index:index] = elements
+            self.selected = {i + len(elements) if i >= index else i for i in self.selected}
+        self.render()
+
+    def delete(self, first, last=None):
+        last = len(self.items) - 1 if last == tk.END else (first if last is None else last)
+        del self.items[first:last + 1]
+        self.selected = {i if i < first else i - (last + 1 - first) for i in self.selected
+                         if not first <= i <= last}
+        self.render()
+
+    def set_items(self, items):
+        """Replace every item at once and clear the selection."""
+        self.items = list(items)
+        self.selected = set()
+        self.offset = 0
+        self.render()
+
+    def get(self, first, last=None):
+        if last is None:
+            return self.items[first]
+        last = len(self.items) - 1 if last == tk.END else last
+        return tuple(self.items[first:last + 1])
+
+    def size(self):
+        return len(self.items)
+
+    def curselection(self):
+        return tuple(sorted(self.selected))
+
+    def selection_set(self, first, last=None):
+        last = first if last is None else (len(self.items) - 1 if last == tk.END else last)
+        self.selected.update(range(first, last + 1))
+        self.render()
+
+    def selection_clear(self, first, last=None):
+        last = first if last is None else (len(self.items) - 1 if last == tk.END else last)
+        self.selected.difference_update(range(first, last + 1))
+        self.render()
+
+    def yview(self, *args):
+        total = len(self.items)
+        if not args:
+            if total == 0:
+                return 0.0, 1.0
+            return self.offset / total, min(1.0, (self.offset + self.visible_rows()) / total)
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = self.visible_rows() if args[2] == 'pages' else 1
+            self.offset += int(args[1]) * step
+        self.render()